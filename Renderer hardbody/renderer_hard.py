@@ -1,28 +1,46 @@
 import bpy
 import math
 import os
-from mathutils import Vector
+from mathutils import Matrix, Vector
 import bmesh
+import numpy as np
 import random
-import glob
+import itertools
+import subprocess
+import sys
+import argparse
+from contextlib import contextmanager
 
 def set_origin_to_center_of_volume(obj):
-    if obj is None or obj.type not in {'MESH', 'CURVE', 'SURFACE', 'META', 'FONT'}:
+    """
+    Set the origin of the given object to its center of volume.
+    This is the area weighted mean of the face centers, the same point
+    origin_set(type='ORIGIN_CENTER_OF_MASS') uses, computed from foreach_get arrays
+    so no operator or selection changes are needed.
+    
+    :param obj: The Blender object to modify
+    """
+    if obj is None or obj.type != 'MESH':
         print(f"Error: Invalid object or object type for origin setting.")
         return
 
-    current_active = bpy.context.view_layer.objects.active
-    current_selection = bpy.context.selected_objects.copy()
-
-    bpy.ops.object.select_all(action='DESELECT')
-    obj.select_set(True)
-    bpy.context.view_layer.objects.active = obj
+    polygons = obj.data.polygons
+    areas = np.empty(len(polygons), dtype=np.float32)
+    centers = np.empty(len(polygons) * 3, dtype=np.float32)
+    polygons.foreach_get('area', areas)
+    polygons.foreach_get('center', centers)
 
-    bpy.ops.object.origin_set(type='ORIGIN_CENTER_OF_MASS', center='MEDIAN')
+    total_area = areas.sum()
+    if total_area > 0:
+        centroid = areas @ centers.reshape(-1, 3) / total_area
+    else:
+        centroid = get_vertex_coords(obj).mean(axis=0)
 
-    bpy.context.view_layer.objects.active = current_active
-    for ob in current_selection:
-        ob.select_set(True)
+    # Move the mesh against the origin so the object stays in place
+    offset = Matrix.Translation(Vector(centroid.tolist()))
+    obj.data.transform(offset.inverted())
+    obj.data.update()
+    obj.matrix_basis = obj.matrix_basis @ offset
 
 def target_lock_object(source_obj, target_obj):
     if source_obj.type not in {'LIGHT', 'CAMERA'}:
@@ -39,11 +57,51 @@ def target_lock_object(source_obj, target_obj):
         constraint.track_axis = 'TRACK_NEGATIVE_Z'
         constraint.up_axis = 'UP_Y'
 
+# Cell offsets of the neighbours that follow a cell in has_doubles
+NEIGHBOUR_OFFSETS = [offset for offset in itertools.product((-1, 0, 1), repeat=3) if offset > (0, 0, 0)]
+
+def has_doubles(obj, threshold):
+    """
+    Check whether any two vertices of the mesh may lie within the merge threshold of each other.
+    The vertices are binned into cubes with the threshold as edge length, two vertices closer than
+    the threshold share a cube or lie in neighbouring cubes. The check runs as a few sorted NumPy
+    passes and errs towards True, so clean meshes skip the bmesh round trip and meshes with
+    doubles are always merged.
+    
+    :param obj: The Blender mesh object to check
+    :param threshold: The distance threshold for doubles
+    """
+    coords = get_vertex_coords(obj)
+    if len(coords) < 2:
+        return False
+    
+    cells = np.floor(coords / threshold).astype(np.int64)
+    cells -= cells.min(axis=0)
+    # One spare cell per axis, so stepping off the grid in y or z never lands on an occupied cell
+    dims = cells.max(axis=0) + 2
+    if np.prod(dims.astype(np.float64)) >= 2**62:
+        return True
+    keys = np.sort((cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2])
+    
+    if (keys[1:] == keys[:-1]).any():
+        return True
+    
+    # Half of the 26 neighbours is enough, the other half is covered from the other vertex
+    for dx, dy, dz in NEIGHBOUR_OFFSETS:
+        neighbours = keys + (dx * dims[1] + dy) * dims[2] + dz
+        found = np.minimum(np.searchsorted(keys, neighbours), len(keys) - 1)
+        if (keys[found] == neighbours).any():
+            return True
+    return False
+
 def remove_doubles_from_mesh(obj, threshold=0.0101):
     if obj.type != 'MESH':
         print(f"Error: Object {obj.name} is not a mesh object.")
         return
 
+    if not has_doubles(obj, threshold):
+        return
+
     bm = bmesh.new()
     bm.from_mesh(obj.data)
     bmesh.ops.remove_doubles(bm, verts=bm.verts, dist=threshold)
@@ -59,9 +117,28 @@ def rotate_object(obj, rotations):
     obj.rotation_mode = 'XYZ'
     obj.rotation_euler = rotations
 
+@contextmanager
+def suppress_stdout():
+    """
+    Silence the stdout of Blender's C code, e.g. the per-tile render progress and the importer logs.
+    The redirection is done on the file descriptor, since those messages do not go through sys.stdout.
+    """
+    sys.stdout.flush()
+    saved_stdout = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved_stdout, 1)
+        os.close(devnull)
+        os.close(saved_stdout)
+
 def import_glb(file_path):
     try:
-        bpy.ops.import_scene.gltf(filepath=file_path)
+        with suppress_stdout():
+            bpy.ops.import_scene.gltf(filepath=file_path)
         imported_objects = bpy.context.selected_objects
         if not imported_objects:
             print(f"Error: No objects were imported from {file_path}")
@@ -71,40 +148,71 @@ def import_glb(file_path):
         print(f"Error importing GLB file: {e}")
         return None
 
+def get_vertex_coords(obj):
+    """
+    Read the local coordinates of all mesh vertices into an (N, 3) NumPy array.
+    foreach_get copies them with a single C call instead of visiting every vertex from Python.
+    
+    :param obj: The Blender mesh object to read
+    """
+    vertices = obj.data.vertices
+    coords = np.empty(len(vertices) * 3, dtype=np.float32)
+    vertices.foreach_get('co', coords)
+    return coords.reshape(-1, 3)
+
 def get_second_lowest_vertex(obj):
-    bm = bmesh.new()
-    bm.from_mesh(obj.data)
+    """
+    Get the world position of the second lowest vertex of the object, or None for meshes with fewer than two vertices.
+    The second lowest is used so a single loose vertex below the mesh does not decide the ground height.
+    Only the Z row of the world matrix is applied to all vertices, the full transform is done for the result alone.
+    """
+    coords = get_vertex_coords(obj)
+    if len(coords) < 2:
+        return None
     
-    sorted_verts = sorted(bm.verts, key=lambda v: (obj.matrix_world @ v.co).z)
+    # World space Z of every vertex, only the third row of the world matrix is needed
+    matrix_world = np.array(obj.matrix_world)
+    world_z = coords @ matrix_world[2, :3] + matrix_world[2, 3]
     
-    if len(sorted_verts) > 1:
-        second_lowest = sorted_verts[1]
-        second_lowest_world = obj.matrix_world @ second_lowest.co
-    else:
-        second_lowest_world = None
+    # Partial selection of the two lowest vertices instead of sorting all of them
+    lowest_two = np.argpartition(world_z, 1)[:2]
+    second_lowest = lowest_two[np.argmax(world_z[lowest_two])]
     
-    bm.free()
-    return second_lowest_world
+    return obj.matrix_world @ Vector(coords[second_lowest].tolist())
 
 
 def move_obj_z_to_zero(obj):
-    bpy.context.scene.cursor.location =  get_second_lowest_vertex(obj)
-    bpy.ops.object.origin_set(type='ORIGIN_CURSOR', center='MEDIAN')
-    obj.location.z = 0    
-    bpy.ops.object.origin_set(type='ORIGIN_CENTER_OF_MASS', center='MEDIAN')
-    obj.location.x = 0  
-    obj.location.y = 0
+    """
+    Put the second lowest vertex of the object on the ground. Only the object is translated,
+    the origin is left alone and set to the center of mass once the scene is built.
+    """
+    bpy.context.view_layer.update()
+    obj.location.z -= get_second_lowest_vertex(obj).z
+
+def apply_rotation(obj):
+    """
+    Bake the rotation of the object into its mesh and reset the rotation,
+    like transform_apply(rotation=True) but without the operator overhead.
+    """
+    location, rotation, scale = obj.matrix_basis.decompose()
+    scale_matrix = Matrix.Diagonal(scale).to_4x4()
+    obj.data.transform(scale_matrix.inverted() @ rotation.to_matrix().to_4x4() @ scale_matrix)
+    obj.data.update()
+    # Reset through the matrix so it works in every rotation mode, the glTF importer uses quaternions
+    obj.matrix_basis = Matrix.LocRotScale(location, None, scale)
 
 def setup_object(glb_path, config):
     obj = import_glb(glb_path)
-    bpy.ops.object.mode_set(mode='OBJECT')
-    
-    move_obj_z_to_zero(obj)
 
     if obj is None:
         print("Error: Failed to import GLB file. Exiting.")
         return
     
+    if bpy.context.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+    
+    move_obj_z_to_zero(obj)
+    
     # Apply mesh optimizations if enabled
     if config['optimize_mesh']:
         print(f"Optimizing mesh with threshold {config['remove_doubles_threshold']}")
@@ -114,32 +222,197 @@ def setup_object(glb_path, config):
     
     return obj
 
-def render_view(output_path, angle, config):
-    bpy.context.scene.render.engine = config['render_engine']
+def enable_gpus(device_type='OPTIX'):
+    """
+    Enable every GPU of the requested compute backend and switch the scene to GPU rendering.
+    Setting only compute_device_type leaves the devices unticked in background mode,
+    in which case Cycles silently falls back to the CPU.
+    If the requested backend is not available the next one in OPTIX, CUDA, HIP, ONEAPI
+    order is used, and the scene falls back to CPU rendering when no GPU is found.
     
+    :param device_type: Preferred compute backend
+    :return: The compute backend that was enabled, 'NONE' for CPU rendering
+    """
+    scene = bpy.context.scene
+    cprefs = bpy.context.preferences.addons['cycles'].preferences
+    
+    for candidate in dict.fromkeys((device_type, 'OPTIX', 'CUDA', 'HIP', 'ONEAPI')):
+        try:
+            cprefs.compute_device_type = candidate
+        except TypeError:
+            # Backend not supported by this Blender build / platform
+            continue
+        
+        cprefs.refresh_devices()
+        gpus = [device for device in cprefs.devices if device.type == candidate]
+        if not gpus:
+            continue
+        
+        for device in cprefs.devices:
+            device.use = device.type == candidate
+        
+        scene.cycles.device = 'GPU'
+        if candidate != device_type:
+            print(f"Compute device {device_type} not available, using {candidate}")
+        return candidate
+    
+    print("Error: No GPU compute device found, rendering on CPU")
+    cprefs.compute_device_type = 'NONE'
+    scene.cycles.device = 'CPU'
+    return 'NONE'
+
+def set_render_engine(engine):
+    """
+    Set the render engine and return the identifier that was used.
+    'EEVEE' is mapped to the name of this Blender version, BLENDER_EEVEE_NEXT in 4.2 to 4.x
+    and BLENDER_EEVEE otherwise.
+    """
+    candidates = [engine]
+    if engine in ('EEVEE', 'BLENDER_EEVEE', 'BLENDER_EEVEE_NEXT'):
+        candidates = ['BLENDER_EEVEE_NEXT', 'BLENDER_EEVEE']
+    
+    for candidate in candidates:
+        try:
+            bpy.context.scene.render.engine = candidate
+            return candidate
+        except TypeError:
+            # Engine not available in this Blender version
+            continue
+    
+    raise ValueError(f"Render engine {engine} is not available")
+
+def _configure_render_once(config):
+    """
+    Apply the scene-wide render settings. These do not change between frames,
+    so they are set once per scene instead of before every render.
+    """
+    scene = bpy.context.scene
+    engine = set_render_engine(config['render_engine'])
+    
+    compute_device = 'NONE'
     if config['gpu_acceleration']:
-        bpy.context.preferences.addons['cycles'].preferences.compute_device_type = config['compute_device']
-        bpy.context.scene.cycles.device = 'GPU'
+        compute_device = enable_gpus(config['compute_device'])
+    
+    resolution_x = config['resolution_x']
+    resolution_y = config['resolution_y']
+    resolution_percentage = config['resolution_percentage']
+    samples = config['samples']
+    
+    # Small square frames with few samples for quick previews and batch dataset runs
+    if config['preview_mode']:
+        resolution_x = resolution_y = 512
+        resolution_percentage = 100
+        samples = 32
     
     # Set render resolution
-    bpy.context.scene.render.resolution_x = config['resolution_x']
-    bpy.context.scene.render.resolution_y = config['resolution_y']
-    bpy.context.scene.render.resolution_percentage = config['resolution_percentage']
+    scene.render.resolution_x = resolution_x
+    scene.render.resolution_y = resolution_y
+    scene.render.resolution_percentage = resolution_percentage
     
     # Set render quality for Cycles
-    if config['render_engine'] == 'CYCLES':
-        bpy.context.scene.cycles.samples = config['samples']
+    if engine == 'CYCLES':
+        scene.cycles.samples = samples
+        
+        # Power-of-two tiles, large ones keep the GPU busy, small ones suit CPU threads
+        tile_size = config['tile_size'] if config['gpu_acceleration'] else 32
+        if hasattr(scene.cycles, 'tile_size'):
+            scene.cycles.tile_size = tile_size
+        else:
+            # Blender 2.9x keeps the tile size on the render settings
+            scene.render.tile_x = tile_size
+            scene.render.tile_y = tile_size
+        
+        # Stop sampling pixels that have converged and let the denoiser clean up the rest
+        cycles = scene.cycles
+        cycles.use_adaptive_sampling = config['use_adaptive_sampling']
+        cycles.adaptive_threshold = config['adaptive_threshold']
+        cycles.adaptive_min_samples = config['adaptive_min_samples']
+        cycles.use_denoising = config['use_denoising']
+        
+        # The OptiX denoiser needs an OptiX device, OpenImageDenoise runs everywhere
+        denoiser = config['denoiser']
+        if denoiser == 'OPTIX' and compute_device != 'OPTIX':
+            denoiser = 'OPENIMAGEDENOISE'
+        cycles.denoiser = denoiser
+        
+        # Let the background show through glass too so the alpha channel denoises cleanly
+        if hasattr(cycles, 'film_transparent_glass'):
+            cycles.film_transparent_glass = config['transparent_background']
+    else:
+        # EEVEE anti-aliasing samples, far fewer are needed than path tracing samples
+        eevee = scene.eevee
+        eevee.taa_render_samples = samples
+        if hasattr(eevee, 'use_soft_shadows'):
+            eevee.use_soft_shadows = True
+    
+    scene.render.image_settings.file_format = config['file_format']
+    scene.render.film_transparent = config['transparent_background']
     
+    # Keep the synced scene, BVH and textures in memory between the renders of an object
+    scene.render.use_persistent_data = config['persistent_data']
+
+def render_view(output_path, angle, config):
     bpy.context.scene.render.filepath = output_path
-    bpy.context.scene.render.image_settings.file_format = config['file_format']
-    bpy.context.scene.render.film_transparent = config['transparent_background']
     
-    bpy.ops.render.render(write_still=True)
+    with suppress_stdout():
+        bpy.ops.render.render(write_still=True)
+
+def setup_camera_ring(camera, config):
+    """
+    Place a copy of the camera for every render angle on a ring around the Z axis and set up
+    one render view per camera, so a single multi-view render writes all the angles.
+    Blender picks the camera of each view by finding the view suffix the scene camera name ends
+    with and replacing it with the suffix of that view, so the scene camera is set to the ring
+    camera of angle 0 (Camera_0) and the view render_60 renders from Camera_60. The view suffix
+    is also added to the output file name.
+    
+    :param camera: The scene camera, copies keep its data and target-lock constraint
+    :param config: Configuration dictionary with the rotation increments
+    :return: List of the ring cameras
+    """
+    scene = bpy.context.scene
+    render = scene.render
+    
+    render.use_multiview = True
+    render.views_format = 'MULTIVIEW'
+    render.image_settings.views_format = 'INDIVIDUAL'
+    
+    # Drop the views of a previous ring, the stereo views can only be disabled
+    for view in list(render.views):
+        if view.name in ('left', 'right'):
+            view.use = False
+        else:
+            render.views.remove(view)
+    
+    ring_cameras = []
+    for angle in range(0, 360, config['rotation_increments']):
+        suffix = f"_{angle}"
+        view = render.views.new(f"render{suffix}")
+        view.camera_suffix = suffix
+        view.file_suffix = suffix
+        
+        # Orbiting the camera by -angle shows the same side as rotating the object by angle
+        ring_camera = camera.copy()
+        ring_camera.name = camera.name + suffix
+        ring_camera.matrix_world = Matrix.Rotation(math.radians(-angle), 4, 'Z') @ camera.matrix_world
+        scene.collection.objects.link(ring_camera)
+        ring_cameras.append(ring_camera)
+    
+    # The base camera name has no view suffix, so it would be used for every view
+    scene.camera = ring_cameras[0]
+    
+    return ring_cameras
 
 def render_step(output_dir, obj, config):
     
     os.makedirs(output_dir, exist_ok=True)
     
+    if config['camera_ring']:
+        # A single multi-view render writes render_<angle>.png for every camera of the ring
+        rotate_object(obj, (0, 0, 0))
+        render_view(os.path.join(output_dir, "render"), 'all', config)
+        return
+    
     # Render multiple views with rotating object
     rotation_increments = config['rotation_increments']
     
@@ -147,22 +420,27 @@ def render_step(output_dir, obj, config):
         
         rotate_object(obj, (0, 0, math.radians(angle)))
         
-        output_path = os.path.join(output_dir, f"render_{angle}.png")
-        render_view(output_path, angle, config)
-
-def setup_scene(obj_path, config):
-    # Set render engine and GPU acceleration
-    bpy.context.scene.render.engine = config['render_engine']
-    if config['gpu_acceleration']:
-        bpy.context.preferences.addons['cycles'].preferences.compute_device_type = config['compute_device']
-        bpy.context.scene.cycles.device = 'GPU'
+        render_view(os.path.join(output_dir, f"render_{angle}.png"), angle, config)
 
-    # Configure compositor nodes for post-processing
-    bpy.context.scene.use_nodes = True
-    tree = bpy.context.scene.node_tree
+def setup_compositor(config):
+    """
+    Build the contrast and saturation compositor tree. The compositor runs on the CPU after
+    every render, so it is turned off when the adjustments would not change the image.
+    """
+    scene = bpy.context.scene
+    if config['contrast'] == 1.0 and config['saturation'] == 1.0:
+        scene.use_nodes = False
+        return
     
-    for node in tree.nodes:
-        tree.nodes.remove(node)
+    scene.use_nodes = True
+    tree = scene.node_tree
+    
+    # The tree only has to be rebuilt when the adjustments changed since it was last built
+    signature = f"{config['contrast']}:{config['saturation']}"
+    if scene.get('_compositor_signature') == signature and len(tree.nodes) == 3:
+        return
+    
+    tree.nodes.clear()
     
     render_layers = tree.nodes.new('CompositorNodeRLayers')
     contrast = tree.nodes.new('CompositorNodeColorCorrection')
@@ -173,23 +451,88 @@ def setup_scene(obj_path, config):
     
     tree.links.new(render_layers.outputs['Image'], contrast.inputs['Image'])
     tree.links.new(contrast.outputs['Image'], output.inputs['Image'])
+    scene['_compositor_signature'] = signature
 
-    # Clear existing objects
-    bpy.ops.object.select_all(action='SELECT')
-    bpy.ops.object.delete()
+def _apply_scene_settings(camera, light, shadow_catcher, config):
+    """
+    Apply the camera, light and shadow catcher settings of the config to the objects of a loaded template,
+    the same values setup_scene_once builds them with.
+    """
+    camera.location = config['camera_location']
+    camera.rotation_euler = config['camera_rotation']
+    
+    light.location = config['light_location']
+    light.data.type = config['light_type']
+    if config['light_type'] == 'SUN':
+        light.data.energy = config['light_energy']
+    
+    half_size = config['shadow_catcher_size'] / 2
+    verts = [(-half_size, -half_size, 0), (half_size, -half_size, 0), (half_size, half_size, 0), (-half_size, half_size, 0)]
+    mesh = shadow_catcher.data
+    mesh.clear_geometry()
+    mesh.from_pydata(verts, [], [(0, 1, 2, 3)])
+    mesh.update()
+    shadow_catcher.location = config['shadow_catcher_location']
+    
+    material = mesh.materials.get("Shadow_Catcher_Material")
+    if material is not None:
+        _get_principled(material).inputs["Alpha"].default_value = config['shadow_opacity']
+
+def load_scene_template(template, config):
+    """
+    Open a scene saved by setup_scene_once and apply the render, compositor, camera, light and shadow catcher
+    settings of the config to it, since those may have changed since the template was saved.
+    GPU devices are preferences and not stored in the file.
+    Returns the camera, light and shadow catcher objects, found by name.
+    """
+    bpy.ops.wm.open_mainfile(filepath=template)
+    
+    _configure_render_once(config)
+    setup_compositor(config)
+    
+    objects = bpy.data.objects
+    camera, light, shadow_catcher = objects["Camera"], objects["Light"], objects["ShadowCatcher"]
+    _apply_scene_settings(camera, light, shadow_catcher, config)
+    shadow_catcher.hide_render = bpy.context.scene.render.engine != 'CYCLES'
+    
+    return camera, light, shadow_catcher
+
+def setup_scene_once(config):
+    """
+    Build the parts of the scene shared by all assets: render settings, compositor,
+    camera, light and shadow catcher. swap_asset then loads an object into it.
+    """
+    scene = bpy.context.scene
+
+    # Load the saved scene instead of building it again
+    template = config['scene_template']
+    if template and os.path.isfile(template):
+        return load_scene_template(template, config)
+
+    # Set render engine, GPU acceleration and output settings
+    _configure_render_once(config)
+
+    # Configure compositor nodes for post-processing
+    setup_compositor(config)
+
+    # Clear existing objects, building the scene from bpy.data avoids the overhead of the operators
+    for ob in list(bpy.data.objects):
+        bpy.data.objects.remove(ob, do_unlink=True)
 
     # Setup camera
     camera_loc = config['camera_location']
     camera_rot = config['camera_rotation']
-    bpy.ops.object.camera_add(location=camera_loc, rotation=camera_rot)
-    camera = bpy.context.active_object
-    bpy.context.scene.camera = camera
+    camera = bpy.data.objects.new("Camera", bpy.data.cameras.new("Camera"))
+    scene.collection.objects.link(camera)
+    camera.location = camera_loc
+    camera.rotation_euler = camera_rot
+    scene.camera = camera
 
     # Setup light
     light_loc = config['light_location']
-    bpy.ops.object.light_add(type=config['light_type'], location=light_loc)
-    light = bpy.context.active_object
-    light.data.type = config['light_type']
+    light = bpy.data.objects.new("Light", bpy.data.lights.new("Light", type=config['light_type']))
+    scene.collection.objects.link(light)
+    light.location = light_loc
     
     if config['light_type'] == 'SUN':
         light.data.energy = config['light_energy']
@@ -200,10 +543,45 @@ def setup_scene(obj_path, config):
         size=config['shadow_catcher_size'], 
         shadow_opacity=config['shadow_opacity']
     )
+    
+    # Shadow catchers only work in Cycles, other engines would render the plane itself
+    if scene.render.engine != 'CYCLES':
+        shadow_catcher.hide_render = True
+
+    # Save the scene, before any asset is imported, for later runs to load
+    if template:
+        bpy.ops.wm.save_as_mainfile(filepath=template, copy=True)
+
+    return camera, light, shadow_catcher
+
+def swap_asset(obj_path, config, camera, light, shadow_catcher):
+    """
+    Replace the object in the scene with a newly imported one and point the camera and light at it.
+    Everything except the camera, light and shadow catcher is removed, including the ring cameras
+    of the previous object, so the scene from setup_scene_once can be reused across assets.
+    """
+    scene = bpy.context.scene
+    scene_objects = {camera.name, light.name, shadow_catcher.name}
+    for ob in list(scene.objects):
+        if ob.name not in scene_objects:
+            bpy.data.objects.remove(ob, do_unlink=True)
+    
+    # Drop the meshes, materials and textures of the previous asset
+    if hasattr(bpy.data, 'orphans_purge'):
+        bpy.data.orphans_purge(do_recursive=True)
+    
+    # The ring cameras of the previous asset are gone, render from the base camera again
+    scene.camera = camera
+    
+    # Undo the framing of the previous asset
+    camera.location = config['camera_location']
+    camera.rotation_euler = config['camera_rotation']
 
     # Import and setup the 3D object
     obj = setup_object(obj_path, config)
     set_origin_to_center_of_volume(obj)
+    obj.location.x = 0
+    obj.location.y = 0
     
     # Apply target tracking
     if config['track_object']:
@@ -213,9 +591,32 @@ def setup_scene(obj_path, config):
     # Optionally fit camera to object
     if config['auto_frame_object']:
         fit_camera_to_object(camera, obj, target_coverage=config['frame_coverage'])
+    
+    # Optionally render all angles from a ring of cameras instead of rotating the object
+    if config['camera_ring']:
+        setup_camera_ring(camera, config)
+    else:
+        scene.render.use_multiview = False
+
+    return obj
 
+def setup_scene(obj_path, config):
+    camera, light, shadow_catcher = setup_scene_once(config)
+    obj = swap_asset(obj_path, config, camera, light, shadow_catcher)
     return camera, light, shadow_catcher, obj
 
+def _get_principled(material):
+    """
+    Return the Principled BSDF node of a material, or None if it has none.
+    The node is looked up by its default name first, which is a hash lookup,
+    and only if it was renamed the nodes are scanned for its type.
+    """
+    nodes = material.node_tree.nodes
+    principled = nodes.get("Principled BSDF")
+    if principled is not None and principled.type == 'BSDF_PRINCIPLED':
+        return principled
+    return next((node for node in nodes if node.type == 'BSDF_PRINCIPLED'), None)
+
 def set_random_color(obj):
     """
     Sets random colors for all materials of an object
@@ -238,12 +639,11 @@ def set_random_color(obj):
         nodes = material.node_tree.nodes
         links = material.node_tree.links
         
-        # Clear existing mix nodes to prevent duplicates
-        for node in nodes:
-            if node.type == 'MIX_RGB':
-                nodes.remove(node)
+        # Clear existing mix nodes to prevent duplicates, collected first so they are not removed while iterating
+        for node in [node for node in nodes if node.type == 'MIX_RGB']:
+            nodes.remove(node)
         
-        principled = next((node for node in nodes if node.type == 'BSDF_PRINCIPLED'), None)
+        principled = _get_principled(material)
         if not principled:
             continue
         
@@ -267,22 +667,22 @@ def set_random_color(obj):
     
     return random_colors
 
-def move_to_zero(obj):
-    
-    bpy.ops.object.transform_apply(rotation=True)
-    bpy.context.scene.cursor.location = get_second_lowest_vertex(obj)
-    bpy.ops.object.origin_set(type='ORIGIN_CURSOR', center='MEDIAN')
-    obj.location.z = 0    
-    bpy.ops.object.origin_set(type='ORIGIN_CENTER_OF_MASS', center='MEDIAN')
-    obj.location.x = 0  
-    obj.location.y = 0   
-
 def rotate_and_setup(obj, rot_radiants):
-    
+    """
+    Bake the rotation into the mesh, then center the object on X/Y and put its second lowest vertex on the ground.
+    The origin is expected at the center of mass, which a rotation around the origin
+    does not move, so a translation is enough and the origin is not recomputed.
+    """
     rotate_object(obj, rot_radiants)
-    bpy.ops.object.transform_apply(rotation=True)
-    bpy.ops.object.origin_set(type='ORIGIN_CENTER_OF_MASS', center='MEDIAN')
-    move_to_zero(obj)   
+    apply_rotation(obj)
+    
+    obj.location.x = 0
+    obj.location.y = 0
+    # matrix_world only follows the new transform once the depsgraph is evaluated,
+    # get_second_lowest_vertex and fit_camera_to_object read it
+    bpy.context.view_layer.update()
+    obj.location.z -= get_second_lowest_vertex(obj).z
+    bpy.context.view_layer.update()
 
 def setup_shadow_catcher(location=(0, 0, 0), size=20, shadow_opacity=0.5):
     """
@@ -292,9 +692,15 @@ def setup_shadow_catcher(location=(0, 0, 0), size=20, shadow_opacity=0.5):
         size: size of the plane
         shadow_opacity: opacity of shadows (0.0 to 1.0)
     """
-    bpy.ops.mesh.primitive_plane_add(size=size, enter_editmode=False, location=location)
-    shadow_catcher = bpy.context.active_object
-    shadow_catcher.name = "ShadowCatcher"
+    half_size = size / 2
+    verts = [(-half_size, -half_size, 0), (half_size, -half_size, 0), (half_size, half_size, 0), (-half_size, half_size, 0)]
+    mesh = bpy.data.meshes.new("ShadowCatcher")
+    mesh.from_pydata(verts, [], [(0, 1, 2, 3)])
+    mesh.update()
+    
+    shadow_catcher = bpy.data.objects.new("ShadowCatcher", mesh)
+    bpy.context.scene.collection.objects.link(shadow_catcher)
+    shadow_catcher.location = location
     shadow_catcher.is_shadow_catcher = True
     shadow_catcher.hide_render = False
     shadow_catcher.hide_viewport = False
@@ -305,22 +711,25 @@ def setup_shadow_catcher(location=(0, 0, 0), size=20, shadow_opacity=0.5):
         shadow_catcher.data.materials.append(material)
     
     material.use_nodes = True
-    nodes = material.node_tree.nodes
     
-    nodes["Principled BSDF"].inputs[4].default_value = shadow_opacity
+    # Look the input up by name, the socket order of the Principled BSDF changed in Blender 4.0
+    _get_principled(material).inputs["Alpha"].default_value = shadow_opacity
     
     return shadow_catcher
 
 def fit_camera_to_object(camera, obj, target_coverage=0.7):
+    scene = bpy.context.scene
     cam_data = camera.data
-    aspect_ratio = bpy.context.scene.render.resolution_x / bpy.context.scene.render.resolution_y
+    aspect_ratio = scene.render.resolution_x / scene.render.resolution_y
     
     if cam_data.sensor_fit == 'VERTICAL':
         fov = cam_data.angle
     else:
         fov = 2 * math.atan(math.tan(cam_data.angle / 2) * aspect_ratio)
     
-    world_bbox_corners = [obj.matrix_world @ Vector(corner) for corner in obj.bound_box]
+    # Shared by the per-corner distances and the view size below
+    tan_fov_half = math.tan(fov / 2)
+    tan_angle_half = math.tan(cam_data.angle / 2)
     
     cam_mat = camera.matrix_world
     cam_loc = cam_mat.translation
@@ -329,38 +738,30 @@ def fit_camera_to_object(camera, obj, target_coverage=0.7):
     cam_dir.negate()
     cam_dir.normalize()
     
-    max_distance = 0
-    min_x = min_y = float('inf')
-    max_x = max_y = float('-inf')
+    # Transform the 8 bounding box corners to camera space with a single matrix product
+    obj_to_cam = np.array(cam_mat.inverted() @ obj.matrix_world)
+    corners = np.array(obj.bound_box)
+    corners_cam_space = corners @ obj_to_cam[:3, :3].T + obj_to_cam[:3, 3]
     
-    for corner in world_bbox_corners:
-        corner_cam_space = camera.matrix_world.inverted() @ corner
-        x, y, z = corner_cam_space
-        
-        if z < 0:
-            min_x = min(min_x, x)
-            max_x = max(max_x, x)
-            min_y = min(min_y, y)
-            max_y = max(max_y, y)
-            
-            if x != 0:
-                dist_x = abs((x * cam_data.clip_start) / (math.tan(fov / 2)))
-            else:
-                dist_x = 0
-                
-            if y != 0:
-                dist_y = abs((y * cam_data.clip_start) / (math.tan(cam_data.angle / 2)))
-            else:
-                dist_y = 0
-                
-            required_dist = max(dist_x, dist_y)
-            max_distance = max(max_distance, required_dist)
+    # Only corners in front of the camera are taken into account
+    visible = corners_cam_space[corners_cam_space[:, 2] < 0]
+    if len(visible) == 0:
+        print(f"Error: {obj.name} is behind the camera, cannot fit the camera to it.")
+        return
+    
+    x, y = visible[:, 0], visible[:, 1]
+    min_x, max_x = x.min(), x.max()
+    min_y, max_y = y.min(), y.max()
+    
+    dist_x = np.abs(x * cam_data.clip_start / tan_fov_half)
+    dist_y = np.abs(y * cam_data.clip_start / tan_angle_half)
+    max_distance = float(max(dist_x.max(), dist_y.max()))
     
     object_width = max_x - min_x
     object_height = max_y - min_y
     
-    view_width = 2 * math.tan(fov / 2) * max_distance
-    view_height = 2 * math.tan(cam_data.angle / 2) * max_distance
+    view_width = 2 * tan_fov_half * max_distance
+    view_height = 2 * tan_angle_half * max_distance
     
     current_coverage = max(object_width / view_width, object_height / view_height)
     
@@ -371,53 +772,70 @@ def fit_camera_to_object(camera, obj, target_coverage=0.7):
     
     bpy.context.view_layer.update()
 
-def main(seed=None, asset="obj_path", output_dir='DATA/renders', config=None):
-    # Set default configuration if not provided
-    if config is None:
-        config = {
-            # Render settings
-            'render_engine': 'CYCLES',
-            'gpu_acceleration': True,
-            'compute_device': 'CUDA',
-            'samples': 128,
-            'resolution_x': 1920,
-            'resolution_y': 1080,
-            'resolution_percentage': 100,
-            'file_format': 'PNG',
-            'transparent_background': True,
-            
-            # Post-processing
-            'contrast': 1.05,
-            'saturation': 1.3,
-            
-            # Camera settings
-            'camera_location': (0, -2.6, 0.5),
-            'camera_rotation': (math.pi/2, 0, 0),
-            'track_object': True,
-            'auto_frame_object': False,
-            'frame_coverage': 0.7,
-            
-            # Light settings
-            'light_type': 'SUN',
-            'light_location': (-3, 0, 2),
-            'light_energy': 1.0,
-            
-            # Shadow catcher
-            'shadow_catcher_location': (0, 0, 0),
-            'shadow_catcher_size': 20,
-            'shadow_opacity': 0.7,
-            
-            # Mesh optimization
-            'optimize_mesh': False,
-            'remove_doubles_threshold': 0.01,
-            
-            # Material settings
-            'random_colors': False,
-            
-            # Rotation settings
-            'rotation_increments': 60,
-            'rotations': [(0,0,0), (90,0,0), (-90,0,0), (0,90,0)]
-        }
+# Default configuration used by main(), keys missing from a passed config fall back to these
+DEFAULT_CONFIG = {
+    # Render settings
+    'render_engine': 'CYCLES',
+    'gpu_acceleration': True,
+    'compute_device': 'OPTIX',
+    'samples': 128,
+    'tile_size': 256,
+    'use_adaptive_sampling': True,
+    'adaptive_threshold': 0.05,
+    'adaptive_min_samples': 16,
+    'use_denoising': True,
+    'denoiser': 'OPTIX',
+    'resolution_x': 1920,
+    'resolution_y': 1080,
+    'resolution_percentage': 100,
+    'preview_mode': False,
+    'file_format': 'PNG',
+    'transparent_background': True,
+    'persistent_data': True,
+    'scene_template': None,
+    
+    # Post-processing
+    'contrast': 1.05,
+    'saturation': 1.3,
+    
+    # Camera settings
+    'camera_location': (0, -2.6, 0.5),
+    'camera_rotation': (math.pi/2, 0, 0),
+    'track_object': True,
+    'camera_ring': False,
+    'auto_frame_object': False,
+    'frame_coverage': 0.7,
+    
+    # Light settings
+    'light_type': 'SUN',
+    'light_location': (-3, 0, 2),
+    'light_energy': 1.0,
+    
+    # Shadow catcher
+    'shadow_catcher_location': (0, 0, 0),
+    'shadow_catcher_size': 20,
+    'shadow_opacity': 0.7,
+    
+    # Mesh optimization
+    'optimize_mesh': False,
+    'remove_doubles_threshold': 0.01,
+    
+    # Material settings
+    'random_colors': False,
+    
+    # Rotation settings
+    'rotation_increments': 60,
+    'rotations': [(0,0,0), (90,0,0), (-90,0,0), (0,90,0)]
+}
+
+def main(seed=None, asset="obj_path", output_dir='DATA/renders', config=None, scene_objects=None):
+    # Nothing is undone in background runs, skip the undo pushes of every operator. The preference
+    # is persistent, so it is left alone when the script runs from the Scripting tab of an open session
+    if bpy.app.background:
+        bpy.context.preferences.edit.use_global_undo = False
+    
+    # Fill in the defaults for anything the passed configuration does not set
+    config = {**DEFAULT_CONFIG, **(config or {})}
     
     if seed is not None:
         random.seed(seed)
@@ -427,7 +845,12 @@ def main(seed=None, asset="obj_path", output_dir='DATA/renders', config=None):
         asset_name = os.path.splitext(asset_name)[0]
         output_dir = os.path.join(output_dir, f"{asset_name}")
     
-    camera, light, shadow_catcher, obj = setup_scene(asset, config)
+    # Reuse the camera, light and shadow catcher of a scene built by setup_scene_once
+    if scene_objects is None:
+        camera, light, shadow_catcher, obj = setup_scene(asset, config)
+    else:
+        camera, light, shadow_catcher = scene_objects
+        obj = swap_asset(asset, config, camera, light, shadow_catcher)
     
     # Apply random colors if enabled
     if config['random_colors']:
@@ -436,7 +859,6 @@ def main(seed=None, asset="obj_path", output_dir='DATA/renders', config=None):
             print(f"Applied random colors to {len(colors)} materials")
     
     rotations = config['rotations']
-    
     for i, rot_degrees in enumerate(rotations):
         rotation_radians = tuple(math.radians(x) for x in rot_degrees)
         rotate_and_setup(obj, rotation_radians)
@@ -448,16 +870,103 @@ def main(seed=None, asset="obj_path", output_dir='DATA/renders', config=None):
         # Reset object rotation
         rotation_radians = tuple(math.radians(-x) for x in rot_degrees)
         rotate_object(obj, rotation_radians)
-        bpy.ops.object.transform_apply(rotation=True)
-        bpy.ops.object.origin_set(type='ORIGIN_CENTER_OF_MASS', center='MEDIAN')
+        apply_rotation(obj)
                 
     print(f"Rendering complete for {asset_name}!")
 
+def iter_glbs(root):
+    """
+    Yield the paths of all .glb files below root. os.walk filters the names directly instead of
+    matching a recursive glob pattern, hidden directories are skipped like glob does.
+    """
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+        for filename in filenames:
+            if filename.endswith('.glb') and not filename.startswith('.'):
+                yield os.path.join(dirpath, filename)
+
+def render_files(glb_files, config, total_files=None):
+    """
+    Render .glb files one after another in the current Blender process.
+    The scene is built once and only the object is swapped between files.
+    glb_files can be any iterable such as iter_glbs, total_files is then needed for the progress output.
+    """
+    scene_objects = setup_scene_once(config)
+    
+    if total_files is None:
+        total_files = len(glb_files)
+    for i, obj_path in enumerate(glb_files, 1):
+        print(f"Processing {i}/{total_files}: {os.path.basename(obj_path)}")
+        main(
+            seed=None, 
+            asset=obj_path, 
+            output_dir=config['output_directory'],
+            config=config,
+            scene_objects=scene_objects
+        )
+        print(f"Completed {i}/{total_files} files")
+
+def render_files_parallel(total_files, config):
+    """
+    Render the total_files .glb files of the models directory with one background Blender process per GPU.
+    Each process only sees its own GPU and renders every num_gpus-th file. The file lists would not fit
+    on the command line for large model directories, so the workers get the models directory and their
+    shard index and list the files themselves with get_shard_files.
+    The worker processes re-run this script, so it has to be saved to disk.
+    """
+    num_gpus = config['num_gpus']
+    script_path = os.path.abspath(__file__)
+    
+    processes = []
+    for gpu_id in range(num_gpus):
+        shard_size = len(range(gpu_id, total_files, num_gpus))
+        if not shard_size:
+            continue
+        
+        env = dict(os.environ, CUDA_VISIBLE_DEVICES=str(gpu_id), HIP_VISIBLE_DEVICES=str(gpu_id))
+        command = [
+            config['blender_executable'], '--background', '--python', script_path, '--',
+            '--models-directory', config['models_directory'], '--shard', str(gpu_id), '--num-shards', str(num_gpus)
+        ]
+        print(f"Starting worker on GPU {gpu_id} with {shard_size} files")
+        processes.append((gpu_id, subprocess.Popen(command, env=env)))
+    
+    for gpu_id, process in processes:
+        if process.wait() != 0:
+            print(f"Error: Worker on GPU {gpu_id} exited with code {process.returncode}")
+
+def get_shard_files(models_directory, shard, num_shards):
+    """
+    Return every num_shards-th .glb file below models_directory, starting at shard.
+    The files are sorted, so the main process and the workers agree on the shards.
+    """
+    return sorted(iter_glbs(models_directory))[shard::num_shards]
+
+def get_worker_files():
+    """
+    Return the .glb files of the shard passed after '--' when this script runs as a worker process,
+    or None otherwise. The list is empty when the models directory changed since the shards were made.
+    """
+    if '--' not in sys.argv:
+        return None
+    worker_args = sys.argv[sys.argv.index('--') + 1:]
+    if '--shard' not in worker_args and '--num-shards' not in worker_args:
+        return None
+    
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--models-directory', required=True)
+    parser.add_argument('--shard', type=int, required=True)
+    parser.add_argument('--num-shards', type=int, required=True)
+    args = parser.parse_args(worker_args)
+    return get_shard_files(args.models_directory, args.shard, args.num_shards)
+
 if __name__ == "__main__":
     # Configuration dictionary for customizing all rendering parameters
     config = {
         # Processing mode
         'mode': 'directory',  # 'single' or 'directory'
+        'num_gpus': 1,  # In directory mode, render with one Blender process per GPU when > 1
+        'blender_executable': 'blender',  # Blender binary used to launch the worker processes
         
         # Input/Output paths
         'single_model_path': "path/to/your/model.glb",
@@ -467,13 +976,22 @@ if __name__ == "__main__":
         # Render settings
         'render_engine': 'CYCLES',  # 'CYCLES' or 'EEVEE'
         'gpu_acceleration': True,
-        'compute_device': 'CUDA',  # 'CUDA', 'OPTIX', or 'OPENCL'
+        'compute_device': 'OPTIX',  # 'OPTIX', 'CUDA', 'HIP' or 'ONEAPI', falls back in that order
         'samples': 128,  # Higher values = better quality but slower
+        'tile_size': 256,  # Cycles GPU tile size in pixels (power of two)
+        'use_adaptive_sampling': True,  # Stop sampling pixels once their noise is below the threshold
+        'adaptive_threshold': 0.05,  # Noise threshold for adaptive sampling, higher = faster but noisier
+        'adaptive_min_samples': 16,  # Samples taken before adaptive sampling can stop a pixel
+        'use_denoising': True,
+        'denoiser': 'OPTIX',  # 'OPTIX' or 'OPENIMAGEDENOISE', OPTIX needs an OptiX GPU
         'resolution_x': 1920,
         'resolution_y': 1080,
         'resolution_percentage': 100,
+        'preview_mode': False,  # 512x512 at 32 samples for quick previews
         'file_format': 'PNG',  # 'PNG', 'JPEG', 'TIFF', etc.
         'transparent_background': True,
+        'persistent_data': True,  # Reuse scene data between renders, uses more memory
+        'scene_template': None,  # Optional .blend file to save the base scene to and load it from
         
         # Post-processing
         'contrast': 1.05,  # Values > 1 increase contrast
@@ -483,6 +1001,7 @@ if __name__ == "__main__":
         'camera_location': (0, -2.6, 0.5),  # (x, y, z)
         'camera_rotation': (math.pi/2, 0, 0),  # (x, y, z) in radians
         'track_object': True,  # Whether camera should track the object
+        'camera_ring': False,  # Render all angles from a ring of cameras in one multi-view render
         'auto_frame_object': False,  # Enable to automatically frame the object
         'frame_coverage': 0.7,  # How much of the frame the object should fill (0.0 to 1.0)
         
@@ -515,7 +1034,14 @@ if __name__ == "__main__":
     }
     
     # Use the configuration
-    if config['mode'] == 'single':
+    worker_files = get_worker_files()
+    
+    if worker_files is not None:
+        # Worker process started by render_files_parallel, an empty shard has nothing to render
+        if worker_files:
+            render_files(worker_files, config)
+    
+    elif config['mode'] == 'single':
         main(
             seed=None, 
             asset=config['single_model_path'], 
@@ -524,19 +1050,14 @@ if __name__ == "__main__":
         )
     
     elif config['mode'] == 'directory':    
-        # Get all .glb files recursively
-        glb_files = glob.glob(os.path.join(config['models_directory'], "**/*.glb"), recursive=True)
+        # Stream the .glb files, counting them first is a cheap walk that keeps no list in memory
+        total_files = sum(1 for _ in iter_glbs(config['models_directory']))
         
-        total_files = len(glb_files)
-        for i, obj_path in enumerate(glb_files, 1):
-            print(f"Processing {i}/{total_files}: {os.path.basename(obj_path)}")
-            main(
-                seed=None, 
-                asset=obj_path, 
-                output_dir=config['output_directory'],
-                config=config
-            )
-            print(f"Completed {i}/{total_files} files")
+        if config['num_gpus'] > 1:
+            # The workers list and sort their shards themselves
+            render_files_parallel(total_files, config)
+        else:
+            render_files(iter_glbs(config['models_directory']), config, total_files)
     
     else:
         print("Invalid mode. Please set 'mode' to either 'single' or 'directory'.")
\ No newline at end of file
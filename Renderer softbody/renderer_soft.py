@@ -1,37 +1,60 @@
 import bpy
 import math
 import os
-from mathutils import Vector
+from mathutils import Matrix, Vector
+from mathutils.kdtree import KDTree
 import bmesh
+import numpy as np
 import random
-import glob
+import itertools
+import sys
+import json
+import tempfile
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+# meshoptimizer is optional, without it meshes are decimated with Blender's Decimate modifier
+try:
+    import meshoptimizer
+except ImportError:
+    meshoptimizer = None
 
 def set_origin_to_center_of_volume(obj):
     """
     Set the origin of the given object to its center of volume.
+    This is the area weighted mean of the face centers, the same point
+    origin_set(type='ORIGIN_CENTER_OF_MASS') uses, computed from foreach_get arrays
+    so no operator or selection changes are needed.
     
     :param obj: The Blender object to modify
     """
-    if obj is None or obj.type not in {'MESH', 'CURVE', 'SURFACE', 'META', 'FONT'}:
-        print(f"Error: Invalid object or object type for origin setting.", type='ERROR')
+    if obj is None or obj.type != 'MESH':
+        print(f"Error: Invalid object or object type for origin setting.")
         return
 
-    current_active = bpy.context.view_layer.objects.active
-    current_selection = bpy.context.selected_objects.copy()
+    polygons = obj.data.polygons
+    areas = np.empty(len(polygons), dtype=np.float32)
+    centers = np.empty(len(polygons) * 3, dtype=np.float32)
+    polygons.foreach_get('area', areas)
+    polygons.foreach_get('center', centers)
 
-    bpy.ops.object.select_all(action='DESELECT')
-    obj.select_set(True)
-    bpy.context.view_layer.objects.active = obj
+    total_area = areas.sum()
+    if total_area > 0:
+        centroid = areas @ centers.reshape(-1, 3) / total_area
+    else:
+        centroid = get_vertex_coords(obj).mean(axis=0)
 
-    bpy.ops.object.origin_set(type='ORIGIN_CENTER_OF_MASS', center='MEDIAN')
+    # Move the mesh against the origin so the object stays in place
+    offset = Matrix.Translation(Vector(centroid.tolist()))
+    obj.data.transform(offset.inverted())
+    obj.data.update()
+    obj.matrix_basis = obj.matrix_basis @ offset
 
     print(f"Origin of {obj.name} set to center of volume")
 
-    bpy.context.view_layer.objects.active = current_active
-    for ob in current_selection:
-        ob.select_set(True)
-
-
 def target_lock_object(source_obj, target_obj):
     """
     Set up a target-lock constraint for a light or camera to point at a specified object.
@@ -56,6 +79,43 @@ def target_lock_object(source_obj, target_obj):
     print(f"{source_obj.type.lower().capitalize()} {source_obj.name} is now target-locked to {target_obj.name}")
     
  
+# Cell offsets of the neighbours that follow a cell in has_doubles
+NEIGHBOUR_OFFSETS = [offset for offset in itertools.product((-1, 0, 1), repeat=3) if offset > (0, 0, 0)]
+
+def has_doubles(obj, threshold):
+    """
+    Check whether any two vertices of the mesh may lie within the merge threshold of each other.
+    The vertices are binned into cubes with the threshold as edge length, two vertices closer than
+    the threshold share a cube or lie in neighbouring cubes. The check runs as a few sorted NumPy
+    passes and errs towards True, so clean meshes skip the bmesh round trip and meshes with
+    doubles are always merged.
+    
+    :param obj: The Blender mesh object to check
+    :param threshold: The distance threshold for doubles
+    """
+    coords = get_vertex_coords(obj)
+    if len(coords) < 2:
+        return False
+    
+    cells = np.floor(coords / threshold).astype(np.int64)
+    cells -= cells.min(axis=0)
+    # One spare cell per axis, so stepping off the grid in y or z never lands on an occupied cell
+    dims = cells.max(axis=0) + 2
+    if np.prod(dims.astype(np.float64)) >= 2**62:
+        return True
+    keys = np.sort((cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2])
+    
+    if (keys[1:] == keys[:-1]).any():
+        return True
+    
+    # Half of the 26 neighbours is enough, the other half is covered from the other vertex
+    for dx, dy, dz in NEIGHBOUR_OFFSETS:
+        neighbours = keys + (dx * dims[1] + dy) * dims[2] + dz
+        found = np.minimum(np.searchsorted(keys, neighbours), len(keys) - 1)
+        if (keys[found] == neighbours).any():
+            return True
+    return False
+
 def remove_doubles_from_mesh(obj, threshold=0.0001):
     """
     Remove double vertices from the mesh of the specified object.
@@ -67,12 +127,9 @@ def remove_doubles_from_mesh(obj, threshold=0.0001):
         print(f"Error: Object {obj.name} is not a mesh object.", type='ERROR')
         return
     
-    original_mode = obj.mode
-    current_mode = obj.mode
-    bpy.ops.object.mode_set(mode='EDIT')
-    bpy.ops.mesh.select_all(action='SELECT')
-    bpy.ops.object.mode_set(mode=current_mode)
-
+    if not has_doubles(obj, threshold):
+        return
+    
     bm = bmesh.new()
 
     bm.from_mesh(obj.data)
@@ -84,9 +141,6 @@ def remove_doubles_from_mesh(obj, threshold=0.0001):
 
     bm.free()
 
-    if original_mode != 'EDIT':
-        bpy.ops.object.mode_set(mode=original_mode)
-
     print(f"Removed double vertices from object: {obj.name} with threshold {threshold}")
 
 def select_boundary_vertices(obj=None):
@@ -145,14 +199,20 @@ def select_vertices_by_distance(obj, distance_threshold=0.1):
         print("No vertices currently selected")
         return 0
     
+    # Index all vertices once so each selected vertex needs a range query instead of a full scan
+    bm.verts.ensure_lookup_table()
+    tree = KDTree(len(bm.verts))
+    for i, v in enumerate(bm.verts):
+        tree.insert(v.co, i)
+    tree.balance()
+    
     newly_selected = set()
     for source_vert in initially_selected:
-        for target_vert in bm.verts:
+        for _, i, _ in tree.find_range(source_vert.co, distance_threshold):
+            target_vert = bm.verts[i]
             if not target_vert.select:  # Skip already selected vertices
-                distance = (source_vert.co - target_vert.co).length
-                if distance <= distance_threshold:
-                    target_vert.select = True
-                    newly_selected.add(target_vert)
+                target_vert.select = True
+                newly_selected.add(target_vert)
     
     bmesh.update_edit_mesh(obj.data)
     
@@ -175,12 +235,79 @@ def merge_boundary_vertices_closeness(obj, threshold=0.003, runs = 3):
     if original_mode != 'EDIT':
         bpy.ops.object.mode_set(mode=original_mode)
 
-def decimate_to_target_faces(obj, target_faces=20000):
+def decimate_with_meshoptimizer(obj, target_faces):
+    """
+    Decimate the mesh with meshoptimizer's quadric simplifier and order the result for
+    vertex cache locality. Triangle corners are split by UV and material, so UV seams and
+    material borders are kept. The simplifier only removes vertices, the kept ones stay
+    at their original positions.
+    
+    :param obj: The Blender mesh object to decimate
+    :param target_faces: Target number of triangles
+    :return: The number of faces after decimation
+    """
+    mesh = obj.data
+    mesh.calc_loop_triangles()
+    triangles = mesh.loop_triangles
+    
+    triangle_loops = np.empty(len(triangles) * 3, dtype=np.int32)
+    triangles.foreach_get('loops', triangle_loops)
+    triangle_materials = np.empty(len(triangles), dtype=np.int32)
+    triangles.foreach_get('material_index', triangle_materials)
+    
+    loop_vertices = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get('vertex_index', loop_vertices)
+    
+    uv_layer = mesh.uv_layers.active
+    uv_name = uv_layer.name if uv_layer is not None else None
+    loop_uvs = np.zeros(len(mesh.loops) * 2, dtype=np.float32)
+    if uv_layer is not None:
+        uv_layer.data.foreach_get('uv', loop_uvs)
+    loop_uvs = loop_uvs.reshape(-1, 2)
+    
+    # One simplifier vertex per unique (vertex, uv, material) corner, the UVs are compared by their bits
+    corners = np.column_stack((
+        loop_vertices[triangle_loops],
+        loop_uvs[triangle_loops].view(np.int32),
+        np.repeat(triangle_materials, 3)
+    ))
+    keys, indices = np.unique(corners, axis=0, return_inverse=True)
+    indices = indices.astype(np.uint32).ravel()
+    coords = get_vertex_coords(obj)
+    
+    simplified = np.empty(len(indices), dtype=np.uint32)
+    count = meshoptimizer.simplify(simplified, indices, coords[keys[:, 0]],
+                                   target_index_count=target_faces * 3, target_error=1.0)
+    new_indices = np.empty(count, dtype=np.uint32)
+    meshoptimizer.optimize_vertex_cache(new_indices, simplified[:count], vertex_count=len(keys))
+    
+    # Keep the used vertices in the order they are first used, like optimize_vertex_fetch
+    corner_vertices = keys[new_indices, 0]
+    used, first_use = np.unique(corner_vertices, return_index=True)
+    order = used[np.argsort(first_use)]
+    remap = np.empty(len(coords), dtype=np.int64)
+    remap[order] = np.arange(len(order))
+    faces = remap[corner_vertices].reshape(-1, 3)
+    
+    uvs = np.ascontiguousarray(keys[new_indices, 1:3]).view(np.float32)
+    materials = keys[new_indices[::3], 3]
+    
+    mesh.clear_geometry()
+    mesh.from_pydata(coords[order].tolist(), [], faces.tolist())
+    if uv_name is not None:
+        mesh.uv_layers.new(name=uv_name).data.foreach_set('uv', uvs.ravel())
+    mesh.polygons.foreach_set('material_index', materials)
+    mesh.update()
+    
+    return len(faces)
+
+def decimate_to_target_faces(obj, target_faces=20000, backend='blender'):
     """
     Decimate object geometry to reach approximately the target number of faces
     
     :param obj: The Blender object to decimate
     :param target_faces: Target number of faces (default 20,000)
+    :param backend: 'blender' for the Decimate modifier or 'meshoptimizer'
     :return: The actual number of faces after decimation
     """
     if obj.type != 'MESH':
@@ -193,6 +320,13 @@ def decimate_to_target_faces(obj, target_faces=20000):
         print(f"Object {obj.name} already has fewer faces ({initial_faces}) than target ({target_faces})")
         return initial_faces
 
+    if backend == 'meshoptimizer':
+        if meshoptimizer is not None:
+            final_faces = decimate_with_meshoptimizer(obj, target_faces)
+            print(f"Decimated {obj.name} from {initial_faces} to {final_faces} faces (target was {target_faces})")
+            return final_faces
+        print("meshoptimizer is not installed, falling back to the Decimate modifier")
+
     ratio = target_faces / initial_faces
 
     decimate = obj.modifiers.new(name="Decimate", type='DECIMATE')
@@ -233,7 +367,8 @@ def set_random_rotation_on_axis(obj, axes='Z'):
         print(f"Error: Invalid axes '{axes}'. Must only contain 'X', 'Y', and/or 'Z'")
         return
     
-    bpy.ops.object.mode_set(mode='OBJECT')
+    if bpy.context.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
     
     obj.rotation_mode = 'XYZ'
     
@@ -245,9 +380,28 @@ def set_random_rotation_on_axis(obj, axes='Z'):
         print(f"Set random rotation of {math.degrees(random_angle):.2f}° on {axis} axis for {obj.name}")
     
 
+@contextmanager
+def suppress_stdout():
+    """
+    Silence the stdout of Blender's C code, e.g. the per-tile render progress and the importer logs.
+    The redirection is done on the file descriptor, since those messages do not go through sys.stdout.
+    """
+    sys.stdout.flush()
+    saved_stdout = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved_stdout, 1)
+        os.close(devnull)
+        os.close(saved_stdout)
+
 def import_glb(file_path):
     try:
-        bpy.ops.import_scene.gltf(filepath=file_path)
+        with suppress_stdout():
+            bpy.ops.import_scene.gltf(filepath=file_path)
         imported_objects = bpy.context.selected_objects
         if not imported_objects:
             print(f"Error: No objects were imported from {file_path}")
@@ -258,73 +412,231 @@ def import_glb(file_path):
         return None
 
 
-def setup_object(glb_path, decimate_target = 1000):
+def setup_object(glb_path, decimate_target = 1000, decimate_backend = 'blender'):
     
     obj = import_glb(glb_path)
     
-    bpy.ops.object.mode_set(mode='OBJECT')
+    if obj is None:
+        print("Error: Failed to import GLB file. Exiting.")
+        return
     
-    bm = bmesh.new()
-    bm.from_mesh(obj.data)
-
-    z_min_vertex = min(bm.verts, key=lambda v: v.co.z)
-    z_min_local = z_min_vertex.co
+    if bpy.context.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+    
+    coords = get_vertex_coords(obj)
+    z_min_local = Vector(coords[coords[:, 2].argmin()].tolist())
 
     z_min_world = obj.matrix_world @ z_min_local
 
     obj.location.z = obj.location.z - z_min_world.z
 
-    bm.free()
-
-
-    if obj is None:
-        print("Error: Failed to import GLB file. Exiting.")
-        return
-    
     obj.name = "Render_object"
     
     #Fix the obj
     remove_doubles_from_mesh(obj, 0.001)
     #merge_boundary_vertices_closeness(obj, 0.002)
     #remove_shape_keys(obj)
-    decimate_to_target_faces(obj, decimate_target)
+    decimate_to_target_faces(obj, decimate_target, decimate_backend)
     
     return obj
 
 
-def render_view(output_path, angle, config):
-    bpy.context.scene.render.engine = config['render_engine']
+def enable_gpus(device_type='OPTIX'):
+    """
+    Enable every GPU of the requested compute backend and switch the scene to GPU rendering.
+    Setting only compute_device_type leaves the devices unticked in background mode,
+    in which case Cycles silently falls back to the CPU.
+    If the requested backend is not available the next one in OPTIX, CUDA, HIP, ONEAPI
+    order is used, and the scene falls back to CPU rendering when no GPU is found.
+    
+    :param device_type: Preferred compute backend
+    :return: The compute backend that was enabled, 'NONE' for CPU rendering
+    """
+    scene = bpy.context.scene
+    cprefs = bpy.context.preferences.addons['cycles'].preferences
+    
+    for candidate in dict.fromkeys((device_type, 'OPTIX', 'CUDA', 'HIP', 'ONEAPI')):
+        try:
+            cprefs.compute_device_type = candidate
+        except TypeError:
+            # Backend not supported by this Blender build / platform
+            continue
+        
+        cprefs.refresh_devices()
+        gpus = [device for device in cprefs.devices if device.type == candidate]
+        if not gpus:
+            continue
+        
+        for device in cprefs.devices:
+            device.use = device.type == candidate
+        
+        scene.cycles.device = 'GPU'
+        if candidate != device_type:
+            print(f"Compute device {device_type} not available, using {candidate}")
+        return candidate
+    
+    print("Error: No GPU compute device found, rendering on CPU")
+    cprefs.compute_device_type = 'NONE'
+    scene.cycles.device = 'CPU'
+    return 'NONE'
+
+def set_render_engine(engine):
+    """
+    Set the render engine and return the identifier that was used.
+    'EEVEE' is mapped to the name of this Blender version, BLENDER_EEVEE_NEXT in 4.2 to 4.x
+    and BLENDER_EEVEE otherwise.
+    """
+    candidates = [engine]
+    if engine in ('EEVEE', 'BLENDER_EEVEE', 'BLENDER_EEVEE_NEXT'):
+        candidates = ['BLENDER_EEVEE_NEXT', 'BLENDER_EEVEE']
+    
+    for candidate in candidates:
+        try:
+            bpy.context.scene.render.engine = candidate
+            return candidate
+        except TypeError:
+            # Engine not available in this Blender version
+            continue
+    
+    raise ValueError(f"Render engine {engine} is not available")
+
+def _configure_render_once(config):
+    """
+    Apply the scene-wide render settings. These do not change between frames,
+    so they are set once per scene instead of before every render.
+    """
+    scene = bpy.context.scene
+    engine = set_render_engine(config['render_engine'])
     
+    compute_device = 'NONE'
     if config['gpu_acceleration']:
-        bpy.context.preferences.addons['cycles'].preferences.compute_device_type = config['compute_device']
-        bpy.context.scene.cycles.device = 'GPU'
+        compute_device = enable_gpus(config['compute_device'])
+    
+    resolution_x = config['resolution_x']
+    resolution_y = config['resolution_y']
+    resolution_percentage = config['resolution_percentage']
+    samples = config['samples']
+    
+    # Small square frames with few samples for quick previews and batch dataset runs
+    if config['preview_mode']:
+        resolution_x = resolution_y = 512
+        resolution_percentage = 100
+        samples = 32
     
     # Set render resolution
-    bpy.context.scene.render.resolution_x = config['resolution_x']
-    bpy.context.scene.render.resolution_y = config['resolution_y']
-    bpy.context.scene.render.resolution_percentage = config['resolution_percentage']
+    scene.render.resolution_x = resolution_x
+    scene.render.resolution_y = resolution_y
+    scene.render.resolution_percentage = resolution_percentage
     
     # Set render quality for Cycles
-    if config['render_engine'] == 'CYCLES':
-        bpy.context.scene.cycles.samples = config['samples']
+    if engine == 'CYCLES':
+        scene.cycles.samples = samples
+        
+        # Power-of-two tiles, large ones keep the GPU busy, small ones suit CPU threads
+        tile_size = config['tile_size'] if config['gpu_acceleration'] else 32
+        if hasattr(scene.cycles, 'tile_size'):
+            scene.cycles.tile_size = tile_size
+        else:
+            # Blender 2.9x keeps the tile size on the render settings
+            scene.render.tile_x = tile_size
+            scene.render.tile_y = tile_size
+        
+        # Stop sampling pixels that have converged and let the denoiser clean up the rest
+        cycles = scene.cycles
+        cycles.use_adaptive_sampling = config['use_adaptive_sampling']
+        cycles.adaptive_threshold = config['adaptive_threshold']
+        cycles.adaptive_min_samples = config['adaptive_min_samples']
+        cycles.use_denoising = config['use_denoising']
+        
+        # The OptiX denoiser needs an OptiX device, OpenImageDenoise runs everywhere
+        denoiser = config['denoiser']
+        if denoiser == 'OPTIX' and compute_device != 'OPTIX':
+            denoiser = 'OPENIMAGEDENOISE'
+        cycles.denoiser = denoiser
+        
+        # Let the background show through glass too so the alpha channel denoises cleanly
+        if hasattr(cycles, 'film_transparent_glass'):
+            cycles.film_transparent_glass = config['transparent_background']
+    else:
+        # EEVEE anti-aliasing samples, far fewer are needed than path tracing samples
+        eevee = scene.eevee
+        eevee.taa_render_samples = samples
+        if hasattr(eevee, 'use_soft_shadows'):
+            eevee.use_soft_shadows = True
+    
+    scene.render.image_settings.file_format = config['file_format']
+    scene.render.film_transparent = config['transparent_background']
     
-    # Set up the render settings
+    # Keep the synced scene, BVH and textures in memory between the renders of an object
+    scene.render.use_persistent_data = config['persistent_data']
+
+def render_view(output_path, angle, config):
     bpy.context.scene.render.filepath = output_path
-    bpy.context.scene.render.image_settings.file_format = config['file_format']
-    bpy.context.scene.render.film_transparent = config['transparent_background']
     
     print(f"Rendered view at {output_path} with angle {angle}")
-    bpy.ops.render.render(write_still=True)
+    with suppress_stdout():
+        bpy.ops.render.render(write_still=True)
+
+def setup_camera_ring(camera, config):
+    """
+    Place a copy of the camera for every render angle on a ring around the Z axis and set up
+    one render view per camera, so a single multi-view render writes all the angles.
+    Blender picks the camera of each view by finding the view suffix the scene camera name ends
+    with and replacing it with the suffix of that view, so the scene camera is set to the ring
+    camera of angle 0 (Camera_0) and the view render_60 renders from Camera_60. The view suffix
+    is also added to the output file name.
+    
+    :param camera: The scene camera, copies keep its data and target-lock constraint
+    :param config: Configuration dictionary with the rotation increments
+    :return: List of the ring cameras
+    """
+    scene = bpy.context.scene
+    render = scene.render
+    
+    render.use_multiview = True
+    render.views_format = 'MULTIVIEW'
+    render.image_settings.views_format = 'INDIVIDUAL'
+    
+    # Drop the views of a previous ring, the stereo views can only be disabled
+    for view in list(render.views):
+        if view.name in ('left', 'right'):
+            view.use = False
+        else:
+            render.views.remove(view)
+    
+    ring_cameras = []
+    for angle in range(0, 360, config['rotation_increments']):
+        suffix = f"_{angle}"
+        view = render.views.new(f"render{suffix}")
+        view.camera_suffix = suffix
+        view.file_suffix = suffix
+        
+        # Orbiting the camera by -angle shows the same side as rotating the object by angle
+        ring_camera = camera.copy()
+        ring_camera.name = camera.name + suffix
+        ring_camera.matrix_world = Matrix.Rotation(math.radians(-angle), 4, 'Z') @ camera.matrix_world
+        scene.collection.objects.link(ring_camera)
+        ring_cameras.append(ring_camera)
+    
+    # The base camera name has no view suffix, so it would be used for every view
+    scene.camera = ring_cameras[0]
+    
+    return ring_cameras
 
 def render_step(output_dir, obj, config):
     os.makedirs(output_dir, exist_ok=True)
 
+    if config['camera_ring']:
+        # A single multi-view render writes render_<angle>.png for every camera of the ring
+        rotate_object(obj, 0)
+        render_view(os.path.join(output_dir, "render"), 'all', config)
+        return
+
     rotation_increments = config['rotation_increments']
     for angle in range(0, 360, rotation_increments):
         rotate_object(obj, angle)
         
-        output_path = os.path.join(output_dir, f"render_{angle}.png")
-        render_view(output_path, angle, config)
+        render_view(os.path.join(output_dir, f"render_{angle}.png"), angle, config)
 
 def remove_shape_keys(obj):
     """
@@ -348,9 +660,15 @@ def setup_shadow_catcher(location=(0, 0, 0), size=20, shadow_opacity=0.5):
         size: size of the plane
         shadow_opacity: opacity of shadows (0.0 to 1.0)
     """
-    bpy.ops.mesh.primitive_plane_add(size=size, enter_editmode=False, location=location)
-    shadow_catcher = bpy.context.active_object
-    shadow_catcher.name = "ShadowCatcher"
+    half_size = size / 2
+    verts = [(-half_size, -half_size, 0), (half_size, -half_size, 0), (half_size, half_size, 0), (-half_size, half_size, 0)]
+    mesh = bpy.data.meshes.new("ShadowCatcher")
+    mesh.from_pydata(verts, [], [(0, 1, 2, 3)])
+    mesh.update()
+    
+    shadow_catcher = bpy.data.objects.new("ShadowCatcher", mesh)
+    bpy.context.scene.collection.objects.link(shadow_catcher)
+    shadow_catcher.location = location
     shadow_catcher.is_shadow_catcher = True
     shadow_catcher.hide_render = False
     shadow_catcher.hide_viewport = False
@@ -361,53 +679,130 @@ def setup_shadow_catcher(location=(0, 0, 0), size=20, shadow_opacity=0.5):
         shadow_catcher.data.materials.append(material)
     
     material.use_nodes = True
-    nodes = material.node_tree.nodes
     
-    nodes["Principled BSDF"].inputs[4].default_value = shadow_opacity
+    # Look the input up by name, the socket order of the Principled BSDF changed in Blender 4.0
+    _get_principled(material).inputs["Alpha"].default_value = shadow_opacity
     
     return shadow_catcher
 
-def setup_scene(obj_path, config):
-    # Set render engine and GPU acceleration
-    bpy.context.scene.render.engine = config['render_engine']
-    if config['gpu_acceleration']:
-        bpy.context.preferences.addons['cycles'].preferences.compute_device_type = config['compute_device']
-        bpy.context.scene.cycles.device = 'GPU'
+def setup_compositor(config):
+    """
+    Build the contrast and saturation compositor tree. The compositor runs on the CPU after
+    every render, so it is turned off when disabled or when the adjustments would not change the image.
+    
+    :param config: Configuration dictionary with the post-processing settings
+    """
+    scene = bpy.context.scene
+    if not config['use_compositor'] or (config['contrast'] == 1.0 and config['saturation'] == 1.0):
+        scene.use_nodes = False
+        return
+    
+    scene.use_nodes = True
+    tree = scene.node_tree
+    
+    # The tree only has to be rebuilt when the adjustments changed since it was last built
+    signature = f"{config['contrast']}:{config['saturation']}"
+    if scene.get('_compositor_signature') == signature and len(tree.nodes) == 3:
+        return
+    
+    tree.nodes.clear()
+    
+    render_layers = tree.nodes.new('CompositorNodeRLayers')
+    contrast = tree.nodes.new('CompositorNodeColorCorrection')
+    output = tree.nodes.new('CompositorNodeComposite')
+    
+    contrast.master_contrast = config['contrast']
+    contrast.master_saturation = config['saturation']
+    
+    tree.links.new(render_layers.outputs['Image'], contrast.inputs['Image'])
+    tree.links.new(contrast.outputs['Image'], output.inputs['Image'])
+    scene['_compositor_signature'] = signature
+
+def _apply_scene_settings(camera, light, shadow_catcher, config):
+    """
+    Apply the camera, light and shadow catcher settings of the config to the objects of a loaded template,
+    the same values setup_scene_once builds them with.
+    """
+    camera.location = config['camera_location']
+    camera.rotation_euler = config['camera_rotation']
+    
+    light.location = config['light_location']
+    light.data.type = config['light_type']
+    if config['light_type'] == 'SUN':
+        light.data.energy = config['light_energy']
+    
+    half_size = config['shadow_catcher_size'] / 2
+    verts = [(-half_size, -half_size, 0), (half_size, -half_size, 0), (half_size, half_size, 0), (-half_size, half_size, 0)]
+    mesh = shadow_catcher.data
+    mesh.clear_geometry()
+    mesh.from_pydata(verts, [], [(0, 1, 2, 3)])
+    mesh.update()
+    shadow_catcher.location = config['shadow_catcher_location']
+    
+    material = mesh.materials.get("Shadow_Catcher_Material")
+    if material is not None:
+        _get_principled(material).inputs["Alpha"].default_value = config['shadow_opacity']
+
+def load_scene_template(template, config):
+    """
+    Open a scene saved by setup_scene_once and apply the render, compositor, camera, light and shadow catcher
+    settings of the config to it, since those may have changed since the template was saved. GPU devices are preferences and not stored in the file.
+    
+    :param template: Path to the .blend file
+    :param config: Configuration dictionary
+    :return: The camera, light and shadow catcher objects, found by name
+    """
+    bpy.ops.wm.open_mainfile(filepath=template)
+    
+    _configure_render_once(config)
+    setup_compositor(config)
+    
+    objects = bpy.data.objects
+    camera, light, shadow_catcher = objects["Camera"], objects["Light"], objects["ShadowCatcher"]
+    _apply_scene_settings(camera, light, shadow_catcher, config)
+    shadow_catcher.hide_render = bpy.context.scene.render.engine != 'CYCLES'
+    
+    return camera, light, shadow_catcher
+
+def setup_scene_once(config):
+    """
+    Build the parts of the scene shared by all assets and runs: render settings, compositor,
+    camera, light and shadow catcher. swap_asset then loads an object into it.
+    
+    :param config: Configuration dictionary
+    :return: The camera, light and shadow catcher objects
+    """
+    scene = bpy.context.scene
+
+    # Load the saved scene instead of building it again
+    template = config['scene_template']
+    if template and os.path.isfile(template):
+        return load_scene_template(template, config)
+
+    # Set render engine, GPU acceleration and output settings
+    _configure_render_once(config)
 
     # Configure compositor nodes for post-processing if enabled
-    if config['use_compositor']:
-        bpy.context.scene.use_nodes = True
-        tree = bpy.context.scene.node_tree
-        
-        for node in tree.nodes:
-            tree.nodes.remove(node)
-        
-        render_layers = tree.nodes.new('CompositorNodeRLayers')
-        contrast = tree.nodes.new('CompositorNodeColorCorrection')
-        output = tree.nodes.new('CompositorNodeComposite')
-        
-        contrast.master_contrast = config['contrast']
-        contrast.master_saturation = config['saturation']
-        
-        tree.links.new(render_layers.outputs['Image'], contrast.inputs['Image'])
-        tree.links.new(contrast.outputs['Image'], output.inputs['Image'])
+    setup_compositor(config)
 
-    # Clear existing objects
-    bpy.ops.object.select_all(action='SELECT')
-    bpy.ops.object.delete()
+    # Clear existing objects, building the scene from bpy.data avoids the overhead of the operators
+    for ob in list(bpy.data.objects):
+        bpy.data.objects.remove(ob, do_unlink=True)
 
     # Create camera
     camera_loc = config['camera_location']
     camera_rot = config['camera_rotation']
-    bpy.ops.object.camera_add(location=camera_loc, rotation=camera_rot)
-    camera = bpy.context.active_object
-    bpy.context.scene.camera = camera
+    camera = bpy.data.objects.new("Camera", bpy.data.cameras.new("Camera"))
+    scene.collection.objects.link(camera)
+    camera.location = camera_loc
+    camera.rotation_euler = camera_rot
+    scene.camera = camera
 
     # Setup light
     light_loc = config['light_location']
-    bpy.ops.object.light_add(type=config['light_type'], location=light_loc)
-    light = bpy.context.active_object
-    light.data.type = config['light_type']
+    light = bpy.data.objects.new("Light", bpy.data.lights.new("Light", type=config['light_type']))
+    scene.collection.objects.link(light)
+    light.location = light_loc
     
     if config['light_type'] == 'SUN':
         light.data.energy = config['light_energy']
@@ -419,8 +814,49 @@ def setup_scene(obj_path, config):
         shadow_opacity=config['shadow_opacity']
     )
     
+    # Shadow catchers only work in Cycles, other engines would render the plane itself
+    if scene.render.engine != 'CYCLES':
+        shadow_catcher.hide_render = True
+
+    # Save the scene, before any asset is imported, for later runs to load
+    if template:
+        bpy.ops.wm.save_as_mainfile(filepath=template, copy=True)
+
+    return camera, light, shadow_catcher
+
+def swap_asset(obj_path, config, camera, light, shadow_catcher):
+    """
+    Replace the object in the scene with a newly imported one and point the camera and light at it.
+    Everything except the camera, light and shadow catcher is removed, including the ring cameras
+    of the previous object, so the scene from setup_scene_once can be reused across assets and runs.
+    
+    :param obj_path: Path to the .glb file to import
+    :param config: Configuration dictionary
+    :param camera: The scene camera
+    :param light: The scene light
+    :param shadow_catcher: The shadow catcher plane, also used as collision plane
+    :return: The imported object
+    """
+    scene = bpy.context.scene
+    scene_objects = {camera.name, light.name, shadow_catcher.name}
+    for ob in list(scene.objects):
+        if ob.name not in scene_objects:
+            bpy.data.objects.remove(ob, do_unlink=True)
+    
+    # The ring cameras of the previous run are gone, render from the base camera again
+    scene.camera = camera
+    
+    # The simulation of the previous run added a collision modifier to the plane
+    for modifier in list(shadow_catcher.modifiers):
+        if modifier.type == 'COLLISION':
+            shadow_catcher.modifiers.remove(modifier)
+    
+    # Drop the meshes, materials and textures of the previous asset
+    if hasattr(bpy.data, 'orphans_purge'):
+        bpy.data.orphans_purge(do_recursive=True)
+    
     # Import and setup 3D object
-    obj = setup_object(obj_path, config['decimate_target'])
+    obj = setup_object(obj_path, config['decimate_target'], config['decimate_backend'])
     
     # Move the obj lowest point to z = 0
     move_to_zero(obj)
@@ -432,12 +868,26 @@ def setup_scene(obj_path, config):
     
     # Set the center of the obj to its volumetric center and make the light track its position
     set_origin_to_center_of_volume(obj)
+    obj.location.x = 0
+    obj.location.y = 0
     
     # Apply target tracking
     if config['track_object']:
         target_lock_object(light, obj)
         target_lock_object(camera, obj)
 
+    # Optionally render all angles from a ring of cameras instead of rotating the object
+    if config['camera_ring']:
+        setup_camera_ring(camera, config)
+    else:
+        scene.render.use_multiview = False
+
+    return obj
+
+
+def setup_scene(obj_path, config):
+    camera, light, shadow_catcher = setup_scene_once(config)
+    obj = swap_asset(obj_path, config, camera, light, shadow_catcher)
     return camera, light, shadow_catcher, obj
 
 
@@ -470,6 +920,18 @@ def setup_simulation_env(plane, obj, simulation_type = 'Softbody'):
     print(f"Simulation parameters: pull={settings.pull:.3f}, "
           f"push={settings.push:.3f}, bend={settings.bend:.3f}")
     
+def get_vertex_coords(obj):
+    """
+    Read the local coordinates of all mesh vertices into an (N, 3) NumPy array.
+    foreach_get copies them with a single C call instead of visiting every vertex from Python.
+    
+    :param obj: The Blender mesh object to read
+    """
+    vertices = obj.data.vertices
+    coords = np.empty(len(vertices) * 3, dtype=np.float32)
+    vertices.foreach_get('co', coords)
+    return coords.reshape(-1, 3)
+
 def get_second_lowest_vertex(obj):
     """
     Get the second lowest vertex of the object
@@ -478,41 +940,124 @@ def get_second_lowest_vertex(obj):
     :param obj: The Blender object to get the second lowest vertex from
     """
     
-    bm = bmesh.new()
-    bm.from_mesh(obj.data)
+    coords = get_vertex_coords(obj)
+    if len(coords) < 2:
+        return None
     
-    sorted_verts = sorted(bm.verts, key=lambda v: (obj.matrix_world @ v.co).z)
+    # World space Z of every vertex, only the third row of the world matrix is needed
+    matrix_world = np.array(obj.matrix_world)
+    world_z = coords @ matrix_world[2, :3] + matrix_world[2, 3]
     
-    if len(sorted_verts) > 1:
-        second_lowest = sorted_verts[1]
-        second_lowest_world = obj.matrix_world @ second_lowest.co
-    else:
-        second_lowest_world = None
+    # Partial selection of the two lowest vertices instead of sorting all of them
+    lowest_two = np.argpartition(world_z, 1)[:2]
+    second_lowest = lowest_two[np.argmax(world_z[lowest_two])]
     
-    bm.free()
-    return second_lowest_world
+    return obj.matrix_world @ Vector(coords[second_lowest].tolist())
 
-def move_to_zero(obj):
+def apply_rotation(obj):
+    """
+    Bake the rotation of the object into its mesh and reset the rotation,
+    like transform_apply(rotation=True) but without the operator overhead.
+    
+    :param obj: The Blender mesh object to modify
+    """
+    location, rotation, scale = obj.matrix_basis.decompose()
+    scale_matrix = Matrix.Diagonal(scale).to_4x4()
+    obj.data.transform(scale_matrix.inverted() @ rotation.to_matrix().to_4x4() @ scale_matrix)
+    obj.data.update()
+    # Reset through the matrix so it works in every rotation mode, the glTF importer uses quaternions
+    obj.matrix_basis = Matrix.LocRotScale(location, None, scale)
 
-    bpy.ops.object.transform_apply( rotation=True)
-    bpy.context.scene.cursor.location =  get_second_lowest_vertex(obj)
-    bpy.ops.object.origin_set(type='ORIGIN_CURSOR', center='MEDIAN')
-    obj.location.z = 0    
-    bpy.ops.object.origin_set(type='ORIGIN_CENTER_OF_MASS', center='MEDIAN')
-    obj.location.x = 0  
+def move_to_zero(obj):
+    """
+    Bake the rotation, put the second lowest vertex of the object on the ground,
+    then set the origin to the center of volume and center the object on X/Y.
+    
+    :param obj: The Blender mesh object to move
+    """
+    apply_rotation(obj)
+    
+    # matrix_world only follows the new transform once the depsgraph is evaluated
+    bpy.context.view_layer.update()
+    obj.location.z -= get_second_lowest_vertex(obj).z
+    
+    set_origin_to_center_of_volume(obj)
+    obj.location.x = 0
     obj.location.y = 0
 
 def shade_smooth(obj):
-    bpy.context.view_layer.objects.active = obj
-    obj.select_set(True)
-    bpy.ops.object.shade_smooth()
+    """
+    Mark all faces of the mesh as smooth shaded, written in one call instead of through the operator.
+    
+    :param obj: The Blender mesh object to shade
+    """
+    polygons = obj.data.polygons
+    polygons.foreach_set('use_smooth', np.ones(len(polygons), dtype=bool))
+    obj.data.update()
 
 def smooth_and_convert_to_quads(obj):
+    """
+    Shade the mesh smooth and join its triangles into quads with bmesh, without switching to edit mode.
+    The thresholds match the defaults of the Tris to Quads operator.
+    
+    :param obj: The Blender mesh object to modify
+    """
     shade_smooth(obj)
-    bpy.ops.object.mode_set(mode='EDIT')
-    bpy.ops.mesh.tris_convert_to_quads()
-    bpy.ops.object.mode_set(mode='OBJECT')
     
+    bm = bmesh.new()
+    bm.from_mesh(obj.data)
+    bmesh.ops.join_triangles(
+        bm,
+        faces=bm.faces,
+        angle_face_threshold=math.radians(40),
+        angle_shape_threshold=math.radians(40)
+    )
+    bm.to_mesh(obj.data)
+    obj.data.update()
+    bm.free()
+    
+# Randomized cloth settings per material as (setting, low, high)
+PLASTIC_CLOTH_RANGES = (
+    ('mass', 0.05, 0.3),
+    ('air_damping', 1, 2),
+    ('bending_stiffness', 0.5, 1),
+    ('tension_stiffness', 0, 15),
+    ('target_volume', 0, 1),
+)
+
+LEATHER_CLOTH_RANGES = (
+    ('mass', 33, 44),
+    
+    ('tension_stiffness', 64.0, 96.0),
+    ('compression_stiffness', 64.0, 96.0),
+    ('shear_stiffness', 64.0, 96.0),
+    ('bending_stiffness', 120.0, 180.0),
+    
+    ('tension_damping', 20.0, 30.0),
+    ('compression_damping', 20.0, 30.0),
+    ('shear_damping', 20.0, 30.0),
+    ('bending_damping', 0.4, 0.6),
+    
+    ('internal_tension_stiffness', 12.0, 18.0),
+    ('internal_compression_stiffness', 12.0, 18.0),
+    ('internal_tension_stiffness_max', 12.0, 18.0),
+    ('internal_compression_stiffness_max', 12.0, 18.0),
+)
+
+def set_random_settings(settings, ranges):
+    """
+    Draw a uniform random value for every setting of a (setting, low, high) table in one
+    vectorized call and assign them. The generator is seeded from the random module,
+    so random.seed still makes the simulations reproducible.
+    
+    :param settings: The settings struct to modify, e.g. the cloth modifier settings
+    :param ranges: Sequence of (setting name, low, high) tuples
+    """
+    rng = np.random.default_rng(random.getrandbits(32))
+    names, lows, highs = zip(*ranges)
+    for name, value in zip(names, rng.uniform(lows, highs).tolist()):
+        setattr(settings, name, value)
+
 def setup_simulation_env_cloth(plane, obj, output_dir, simulation_type='Cloth', config=None):
     """
     Set up simulation environment with randomized parameters
@@ -522,6 +1067,7 @@ def setup_simulation_env_cloth(plane, obj, output_dir, simulation_type='Cloth',
     :param output_dir: The directory to save the simulation parameters
     :param simulation_type: Type of simulation to apply ('Cloth' or 'SOFT_BODY')
     :param config: Configuration dictionary with simulation parameters
+    :return: Dictionary of the drawn simulation parameters
     """    
     if config is None:
         config = {
@@ -537,14 +1083,10 @@ def setup_simulation_env_cloth(plane, obj, output_dir, simulation_type='Cloth',
     material = config['simulation_material']
     
     if material == "plastic":
-        settings.mass = random.uniform(0.05, 0.3)
-        settings.air_damping = random.uniform(1, 2)
-        settings.bending_stiffness = random.uniform(0.5, 1)
-        settings.tension_stiffness = random.uniform(0, 15)
-        
         settings.use_pressure = True
         settings.use_pressure_volume = True
-        settings.target_volume = random.uniform(0, 1)
+        set_random_settings(settings, PLASTIC_CLOTH_RANGES)
+        
         if random.random() < 0.6:
             settings.use_internal_springs = True
             settings.internal_tension_stiffness = random.uniform(0, 1)
@@ -563,23 +1105,8 @@ def setup_simulation_env_cloth(plane, obj, output_dir, simulation_type='Cloth',
         collision_settings.distance_min = 0.001
         
     elif material == "leather":
-        settings.mass = random.uniform(33, 44)
-        
-        settings.tension_stiffness = random.uniform(64.0, 96.0)  
-        settings.compression_stiffness = random.uniform(64.0, 96.0)   
-        settings.shear_stiffness = random.uniform(64.0, 96.0)  
-        settings.bending_stiffness = random.uniform(120.0, 180.0)  
-        
-        settings.tension_damping = random.uniform(20.0, 30.0)  
-        settings.compression_damping = random.uniform(20.0, 30.0)  
-        settings.shear_damping = random.uniform(20.0, 30.0)  
-        settings.bending_damping = random.uniform(0.4, 0.6)  
-        
         settings.use_internal_springs = True
-        settings.internal_tension_stiffness = random.uniform(12.0, 18.0)  
-        settings.internal_compression_stiffness = random.uniform(12.0, 18.0)  
-        settings.internal_tension_stiffness_max = random.uniform(12.0, 18.0) 
-        settings.internal_compression_stiffness_max = random.uniform(12.0, 18.0) 
+        set_random_settings(settings, LEATHER_CLOTH_RANGES)
  
         collision_settings = obj.modifiers["Cloth"].collision_settings
         collision_settings.use_collision = True
@@ -617,14 +1144,31 @@ def setup_simulation_env_cloth(plane, obj, output_dir, simulation_type='Cloth',
           f"air_damping={settings.air_damping:.3f}, "
           f"bending_stiffness={settings.bending_stiffness:.3f}, "
           f"tension_stiffness={settings.tension_stiffness:.3f}")
+    
+    return params_dict
 
 def run_physics_simulation(duration=10.0, frame_rate=24):
+    """
+    Bake the physics caches of the scene in one go and jump to the last frame.
+    The bake steps through the frames internally, so there is no Python frame loop
+    with a depsgraph update per frame.
+    
+    :param duration: Length of the simulation in seconds
+    :param frame_rate: Frames per second of the simulation
+    :return: The last frame of the simulation
+    """
     scene = bpy.context.scene
     scene.frame_end = int(duration * frame_rate)
 
-    for frame in range(scene.frame_start, scene.frame_end + 1):
-        scene.frame_set(frame)
-        bpy.context.view_layer.update()
+    # Point caches stop at frame 250 by default, make sure they cover the whole simulation
+    for ob in scene.objects:
+        for modifier in ob.modifiers:
+            point_cache = getattr(modifier, 'point_cache', None)
+            if point_cache is not None:
+                point_cache.frame_start = scene.frame_start
+                point_cache.frame_end = scene.frame_end
+
+    bpy.ops.ptcache.bake_all(bake=True)
 
     scene.frame_set(scene.frame_end)
     return scene.frame_end
@@ -653,10 +1197,12 @@ def apply_simulation_as_default(obj, simulation_type= 'Cloth'):
     
     :param obj: The object with the soft body simulation
     """    
+    scene = bpy.context.scene
     
-    bpy.context.scene.frame_set(bpy.context.scene.frame_end)
+    scene.frame_set(scene.frame_end)
     
-    bpy.ops.object.select_all(action='DESELECT')
+    for ob in bpy.context.selected_objects:
+        ob.select_set(False)
     obj.select_set(True)
     bpy.context.view_layer.objects.active = obj
     
@@ -664,9 +1210,111 @@ def apply_simulation_as_default(obj, simulation_type= 'Cloth'):
     
     set_origin_to_center_of_volume(obj)
     
-    bpy.context.scene.frame_set(0)
+    scene.frame_set(0)
 
 
+def write_obj(obj, filepath):
+    """
+    Write the world space vertices and the faces of a mesh object to a Wavefront OBJ file
+    
+    :param obj: The mesh object to write
+    :param filepath: Path of the OBJ file
+    """
+    matrix = np.array(obj.matrix_world)
+    coords = get_vertex_coords(obj) @ matrix[:3, :3].T + matrix[:3, 3]
+    
+    with open(filepath, "w") as f:
+        np.savetxt(f, coords, fmt="v %.6f %.6f %.6f")
+        for polygon in obj.data.polygons:
+            f.write("f " + " ".join(str(i + 1) for i in polygon.vertices) + "\n")
+
+def read_obj_vertices(filepath):
+    """
+    Read the vertex positions of a Wavefront OBJ file
+    
+    :param filepath: Path of the OBJ file
+    :return: numpy array of shape (n, 3) with the vertex positions
+    """
+    with open(filepath) as f:
+        coords = [line.split()[1:4] for line in f if line.startswith("v ")]
+    return np.array(coords, dtype=np.float64).reshape(-1, 3)
+
+def simulate_external(plane, obj, output_dir, config):
+    """
+    Run the cloth simulation in an external solver instead of Blender's cloth modifier.
+    The parameters are drawn the same way as for the Blender solver, the mesh and the
+    parameters are written to disk, the command in config['external_cloth_command'] is run
+    and the final frame it writes is loaded back into the mesh. The solver has to keep the
+    vertex order, so the materials and UVs of the object stay valid.
+    
+    :param plane: The collision plane
+    :param obj: The object to simulate
+    :param output_dir: The directory to save the simulation parameters
+    :param config: Configuration dictionary with simulation parameters
+    """
+    if not config.get('external_cloth_command'):
+        raise ValueError("cloth_backend 'external' requires 'external_cloth_command' to be set")
+    
+    params_dict = setup_simulation_env_cloth(plane, obj, output_dir, 'Cloth', config)
+    
+    # Only the drawn values are needed, the solve happens outside of Blender
+    obj.modifiers.remove(obj.modifiers["Cloth"])
+    plane.modifiers.remove(plane.modifiers["Cloth"])
+    
+    params_dict.update({
+        "material": config['simulation_material'],
+        "iterations": params_dict["collision_quality"],
+        "duration": random.uniform(config['simulation_min_duration'], config['simulation_max_duration']),
+        "frame_rate": 24,
+        "ground_height": plane.location.z
+    })
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = {
+            'input': os.path.join(tmp_dir, "input.obj"),
+            'output': os.path.join(tmp_dir, "output.obj"),
+            'params': os.path.join(tmp_dir, "params.json")
+        }
+        # The rotation and elevation set in main only reach matrix_world once the depsgraph is evaluated
+        bpy.context.view_layer.update()
+        write_obj(obj, paths['input'])
+        with open(paths['params'], "w") as f:
+            json.dump(params_dict, f, indent=2)
+        
+        command = [part.format(**paths) for part in config['external_cloth_command']]
+        subprocess.run(command, check=True)
+        
+        if not os.path.isfile(paths['output']):
+            raise RuntimeError(f"External cloth solver {command[0]} exited without writing {paths['output']}")
+        coords = read_obj_vertices(paths['output'])
+    
+    mesh = obj.data
+    if len(coords) != len(mesh.vertices):
+        raise ValueError(f"External cloth solver returned {len(coords)} vertices, expected {len(mesh.vertices)}")
+    
+    # Back from world to object space
+    matrix = np.array(obj.matrix_world)
+    coords = (coords - matrix[:3, 3]) @ np.linalg.inv(matrix[:3, :3]).T
+    mesh.vertices.foreach_set('co', coords.astype(np.float32).ravel())
+    mesh.update()
+    
+    set_origin_to_center_of_volume(obj)
+
+
+def _get_principled(material):
+    """
+    Return the Principled BSDF node of a material, or None if it has none.
+    The node is looked up by its default name first, which is a hash lookup,
+    and only if it was renamed the nodes are scanned for its type.
+    
+    :param material: The material to search, must use nodes
+    """
+    nodes = material.node_tree.nodes
+    principled = nodes.get("Principled BSDF")
+    if principled is not None and principled.type == 'BSDF_PRINCIPLED':
+        return principled
+    return next((node for node in nodes if node.type == 'BSDF_PRINCIPLED'), None)
+
 def set_random_color(obj):
     """
     Multiply the existing material color/texture with a random color,
@@ -687,10 +1335,7 @@ def set_random_color(obj):
     nodes = material.node_tree.nodes
     links = material.node_tree.links
     
-    principled = next(
-        (node for node in nodes if node.type == 'BSDF_PRINCIPLED'),
-        None
-    )
+    principled = _get_principled(material)
     
     if not principled:
         print(f"Error: No Principled BSDF node found in material {material.name}")
@@ -723,61 +1368,87 @@ def set_random_color(obj):
     return random_color
 
 
-def main(seed=None, run_number=None, asset=None, output_dir=None, config=None):
-    # Set default configuration if not provided
-    if config is None:
-        config = {
-            # Render settings
-            'render_engine': 'CYCLES',
-            'gpu_acceleration': True,
-            'compute_device': 'CUDA',
-            'samples': 128,
-            'resolution_x': 1920,
-            'resolution_y': 1080,
-            'resolution_percentage': 100,
-            'file_format': 'PNG',
-            'transparent_background': True,
-            
-            # Post-processing
-            'use_compositor': True,
-            'contrast': 1.05,
-            'saturation': 1.3,
-            
-            # Camera settings
-            'camera_location': (0, -2, 0.5),
-            'camera_rotation': (math.pi/2, 0, 0),
-            'track_object': True,
-            
-            # Light settings
-            'light_type': 'SUN',
-            'light_location': (-3, 0, 2),
-            'light_energy': 1.0,
-            
-            # Shadow catcher
-            'shadow_catcher_location': (0, 0, 0),
-            'shadow_catcher_size': 20,
-            'shadow_opacity': 0.6,
-            
-            # Mesh optimization
-            'optimize_mesh': False,
-            'remove_doubles_threshold': 0.001,
-            'decimate_target': 10000,
-            
-            # Material settings
-            'random_colors': True,
-            
-            # Rotation settings
-            'rotation_increments': 60,
-            
-            # Simulation settings
-            'simulation_type': 'Cloth',  # 'Cloth' or 'Softbody'
-            'simulation_material': 'leather',  # 'leather' or 'plastic'
-            'simulation_min_duration': 0.5,
-            'simulation_max_duration': 8.0,
-            'save_parameters': True,
-            'object_elevation': 0.2,  # Initial Z height for the object
-            'object_final_elevation': 0.02  # Final Z height after simulation
-        }
+# Default configuration used by main(), keys missing from a passed config fall back to these
+DEFAULT_CONFIG = {
+    # Render settings
+    'render_engine': 'CYCLES',
+    'gpu_acceleration': True,
+    'compute_device': 'OPTIX',
+    'samples': 128,
+    'tile_size': 256,
+    'use_adaptive_sampling': True,
+    'adaptive_threshold': 0.05,
+    'adaptive_min_samples': 16,
+    'use_denoising': True,
+    'denoiser': 'OPTIX',
+    'resolution_x': 1920,
+    'resolution_y': 1080,
+    'resolution_percentage': 100,
+    'preview_mode': False,
+    'file_format': 'PNG',
+    'transparent_background': True,
+    'persistent_data': True,
+    'scene_template': None,
+    
+    # Post-processing
+    'use_compositor': True,
+    'contrast': 1.05,
+    'saturation': 1.3,
+    
+    # Camera settings
+    'camera_location': (0, -2, 0.5),
+    'camera_rotation': (math.pi/2, 0, 0),
+    'track_object': True,
+    'camera_ring': False,
+    
+    # Light settings
+    'light_type': 'SUN',
+    'light_location': (-3, 0, 2),
+    'light_energy': 1.0,
+    
+    # Shadow catcher
+    'shadow_catcher_location': (0, 0, 0),
+    'shadow_catcher_size': 20,
+    'shadow_opacity': 0.6,
+    
+    # Mesh optimization
+    'optimize_mesh': False,
+    'remove_doubles_threshold': 0.001,
+    'decimate_target': 10000,
+    'decimate_backend': 'blender',
+    
+    # Material settings
+    'random_colors': True,
+    
+    # Rotation settings
+    'rotation_increments': 60,
+    
+    # Simulation settings
+    'simulation_type': 'Cloth',  # 'Cloth' or 'Softbody'
+    'simulation_material': 'leather',  # 'leather' or 'plastic'
+    'simulation_min_duration': 0.5,
+    'simulation_max_duration': 8.0,
+    'cloth_backend': 'blender',  # 'blender' or 'external'
+    'external_cloth_command': None,
+    'save_parameters': True,
+    'object_elevation': 0.2,  # Initial Z height for the object
+    'object_final_elevation': 0.02  # Final Z height after simulation
+}
+
+def main(seed=None, run_number=None, asset=None, output_dir=None, config=None, scene_objects=None):
+    # Nothing is undone in background runs, skip the undo pushes of every operator. The preference
+    # is persistent, so it is left alone when the script runs from the Scripting tab of an open session
+    if bpy.app.background:
+        bpy.context.preferences.edit.use_global_undo = False
+    
+    # Fill in the defaults for anything the passed configuration does not set
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    
+    # Fail before importing and simulating anything when the external solver is not set up
+    if config['cloth_backend'] not in ('blender', 'external'):
+        raise ValueError(f"Unknown cloth_backend: {config['cloth_backend']}, expected 'blender' or 'external'")
+    if config['cloth_backend'] == 'external' and not config['external_cloth_command']:
+        raise ValueError("cloth_backend 'external' requires 'external_cloth_command' to be set")
 
     # Set global random seed
     if seed is not None:
@@ -796,10 +1467,15 @@ def main(seed=None, run_number=None, asset=None, output_dir=None, config=None):
     bpy.context.scene.frame_set(1)
 
     # Load & setup all the assets
-    camera, light, shadow_catcher, obj = setup_scene(asset, config)
+    # Reuse the camera, light and shadow catcher of a scene built by setup_scene_once
+    if scene_objects is None:
+        camera, light, shadow_catcher, obj = setup_scene(asset, config)
+    else:
+        camera, light, shadow_catcher = scene_objects
+        obj = swap_asset(asset, config, camera, light, shadow_catcher)
 
     # Only set object mode if we have objects in the scene
-    if bpy.context.selected_objects:
+    if bpy.context.selected_objects and bpy.context.mode != 'OBJECT':
         bpy.ops.object.mode_set(mode='OBJECT')
 
     # Set random rotation on all axes and set position above the plane
@@ -811,10 +1487,13 @@ def main(seed=None, run_number=None, asset=None, output_dir=None, config=None):
         set_random_color(obj)
 
     #Simulate obj state with randomized parameters
-    frame_end = simulate_step(shadow_catcher, obj, save_dir, config)   
-    
-    # Apply the simulation as the default state of the object
-    apply_simulation_as_default(obj, config['simulation_type'])
+    if config['cloth_backend'] == 'external' and config['simulation_type'] == 'Cloth':
+        simulate_external(shadow_catcher, obj, save_dir, config)
+    else:
+        frame_end = simulate_step(shadow_catcher, obj, save_dir, config)   
+        
+        # Apply the simulation as the default state of the object
+        apply_simulation_as_default(obj, config['simulation_type'])
     shade_smooth(obj)
 
     # Move the object to the origin in case the obj moved due to simulation
@@ -827,11 +1506,108 @@ def main(seed=None, run_number=None, asset=None, output_dir=None, config=None):
     
     print("Rendering complete!")
 
+def iter_glbs(root):
+    """
+    Yield the paths of all .glb files below root. os.walk filters the names directly instead of
+    matching a recursive glob pattern, hidden directories are skipped like glob does.
+    
+    :param root: Directory to search
+    """
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+        for filename in filenames:
+            if filename.endswith('.glb') and not filename.startswith('.'):
+                yield os.path.join(dirpath, filename)
+
+def render_files(glb_files, config, total_files=None):
+    """
+    Render every run of .glb files one after another in the current Blender process.
+    The scene is built once and only the object is swapped between runs.
+    
+    :param glb_files: Paths of the .glb files to render, any iterable such as iter_glbs
+    :param config: Configuration dictionary
+    :param total_files: Number of files for the progress output, needed when glb_files has no length
+    """
+    scene_objects = setup_scene_once(config)
+    
+    if total_files is None:
+        total_files = len(glb_files)
+    for i, obj_path in enumerate(glb_files, 1):
+        print(f"Processing {i}/{total_files}: {os.path.basename(obj_path)}")
+        for run in range(config['runs_per_object']):
+            main(
+                asset=obj_path, 
+                output_dir=config['output_directory'], 
+                run_number=run, 
+                seed=None,
+                config=config,
+                scene_objects=scene_objects
+            )
+        print(f"Completed {i}/{total_files} files")
+
+def render_runs_parallel(glb_files, config, total_files=None):
+    """
+    Render every run of every .glb file in its own background Blender process, keeping one
+    process busy per GPU. Each process only sees its own GPU, and starting a fresh one per run
+    also releases the memory Blender holds on to between imports.
+    The worker processes re-run this script, so it has to be saved to disk.
+    
+    :param glb_files: Paths of the .glb files to render, any iterable such as iter_glbs
+    :param config: Configuration dictionary
+    :param total_files: Number of files for the progress output, needed when glb_files has no length
+    """
+    script_path = os.path.abspath(__file__)
+    if total_files is None:
+        total_files = len(glb_files)
+    
+    # The jobs are drawn from a generator as the GPUs free up, so the file list is never built
+    jobs = ((obj_path, run) for obj_path in glb_files for run in range(config['runs_per_object']))
+    jobs_lock = threading.Lock()
+    
+    def run_gpu(gpu_id):
+        env = dict(os.environ, CUDA_VISIBLE_DEVICES=str(gpu_id), HIP_VISIBLE_DEVICES=str(gpu_id))
+        while True:
+            with jobs_lock:
+                job = next(jobs, None)
+            if job is None:
+                return
+            
+            obj_path, run = job
+            command = [
+                config['blender_executable'], '--background', '--python', script_path,
+                '--', '--asset', obj_path, '--run', str(run)
+            ]
+            returncode = subprocess.call(command, env=env)
+            
+            if returncode != 0:
+                print(f"Error: Run {run} of {os.path.basename(obj_path)} exited with code {returncode}")
+            else:
+                print(f"Completed run {run} of {os.path.basename(obj_path)} on GPU {gpu_id}")
+    
+    print(f"Rendering {total_files * config['runs_per_object']} runs on {config['num_gpus']} GPUs")
+    with ThreadPoolExecutor(max_workers=config['num_gpus']) as executor:
+        list(executor.map(run_gpu, range(config['num_gpus'])))
+
+def get_worker_job():
+    """
+    Return the (asset, run) passed after '--' when this script runs as a worker process, or None
+    """
+    if '--' not in sys.argv:
+        return None
+    
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--asset', required=True)
+    parser.add_argument('--run', type=int, required=True)
+    args = parser.parse_args(sys.argv[sys.argv.index('--') + 1:])
+    return args.asset, args.run
+
 if __name__ == "__main__":
     # Configuration dictionary for customizing all rendering parameters
     config = {
         # Processing mode
         'mode': 'directory',  # 'single' or 'directory'
+        'num_gpus': 1,  # In directory mode, render the runs in one Blender process per GPU when > 1
+        'blender_executable': 'blender',  # Blender binary used to launch the worker processes
         
         # Input/Output paths
         'single_model_path': "path/to/your/model.glb",
@@ -844,13 +1620,22 @@ if __name__ == "__main__":
         # Render settings
         'render_engine': 'CYCLES',
         'gpu_acceleration': True,
-        'compute_device': 'CUDA',
+        'compute_device': 'OPTIX',
         'samples': 128,
+        'tile_size': 256,
+        'use_adaptive_sampling': True,
+        'adaptive_threshold': 0.05,
+        'adaptive_min_samples': 16,
+        'use_denoising': True,
+        'denoiser': 'OPTIX',
         'resolution_x': 1920,
         'resolution_y': 1080,
         'resolution_percentage': 100,
+        'preview_mode': False,
         'file_format': 'PNG',
         'transparent_background': True,
+        'persistent_data': True,
+        'scene_template': None,
         
         # Post-processing
         'use_compositor': True,
@@ -861,6 +1646,7 @@ if __name__ == "__main__":
         'camera_location': (0, -2, 0.5),
         'camera_rotation': (math.pi/2, 0, 0),
         'track_object': True,
+        'camera_ring': False,
         
         # Light settings
         'light_type': 'SUN',
@@ -876,6 +1662,7 @@ if __name__ == "__main__":
         'optimize_mesh': False,
         'remove_doubles_threshold': 0.001,
         'decimate_target': 10000,
+        'decimate_backend': 'blender',
         
         # Material settings
         'random_colors': False,
@@ -888,12 +1675,26 @@ if __name__ == "__main__":
         'simulation_material': 'leather',  # 'leather' or 'plastic'
         'simulation_min_duration': 0.5,
         'simulation_max_duration': 8.0,
+        'cloth_backend': 'blender',  # 'blender' or 'external'
+        'external_cloth_command': None,
         'save_parameters': True,
         'object_elevation': 0.2,  # Initial Z height for the object
         'object_final_elevation': 0.02  # Final Z height after simulation
     }
 
-    if config['mode'] == 'single':
+    worker_job = get_worker_job()
+    
+    if worker_job:
+        # Worker process started by render_runs_parallel
+        asset, run = worker_job
+        main(
+            asset=asset, 
+            output_dir=config['output_directory'], 
+            run_number=run,
+            config=config
+        )
+    
+    elif config['mode'] == 'single':
         # Process a single model
         main(
             asset=config['single_model_path'], 
@@ -903,21 +1704,14 @@ if __name__ == "__main__":
         )
     
     elif config['mode'] == 'directory':    
-        # Get all .glb files recursively
-        glb_files = glob.glob(os.path.join(config['models_directory'], "**/*.glb"), recursive=True)
-        total_files = len(glb_files)
-
-        for i, obj_path in enumerate(glb_files, 1):
-            print(f"Processing {i}/{total_files}: {os.path.basename(obj_path)}")
-            for run in range(config['runs_per_object']):
-                main(
-                    asset=obj_path, 
-                    output_dir=config['output_directory'], 
-                    run_number=run, 
-                    seed=None,
-                    config=config
-                )
-            print(f"Completed {i}/{total_files} files") 
+        # Stream the .glb files, counting them first is a cheap walk that keeps no list in memory
+        glb_files = iter_glbs(config['models_directory'])
+        total_files = sum(1 for _ in iter_glbs(config['models_directory']))
+
+        if config['num_gpus'] > 1:
+            render_runs_parallel(glb_files, config, total_files)
+        else:
+            render_files(glb_files, config, total_files)
     
     else:
         print("Invalid mode. Please set 'mode' to either 'single' or 'directory'.") 
\ No newline at end of file
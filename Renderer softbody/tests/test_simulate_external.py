@@ -0,0 +1,71 @@
+"""
+Tests for the external cloth solver hand-off. They need Blender's Python, run them with
+blender --background --python-exit-code 1 --python "Renderer softbody/tests/test_simulate_external.py"
+"""
+import bpy
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import numpy as np
+from mathutils import Euler, Matrix, Vector
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import renderer_soft
+
+# Copies the input OBJ to the output unchanged and keeps a copy of it for the test
+IDENTITY_SOLVER = "import shutil, sys; shutil.copyfile(sys.argv[1], sys.argv[2]); shutil.copyfile(sys.argv[1], sys.argv[3])"
+
+def add_cube(name):
+    mesh = bpy.data.meshes.new(name)
+    corners = [(x, y, z) for x in (-0.5, 0.5) for y in (-0.5, 0.5) for z in (-0.5, 0.5)]
+    faces = [(0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1), (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3)]
+    mesh.from_pydata(corners, [], faces)
+    obj = bpy.data.objects.new(name, mesh)
+    bpy.context.scene.collection.objects.link(obj)
+    return obj
+
+def world_coords(obj):
+    bpy.context.view_layer.update()
+    matrix = np.array(obj.matrix_world)
+    return renderer_soft.get_vertex_coords(obj) @ matrix[:3, :3].T + matrix[:3, 3]
+
+class SimulateExternalTest(unittest.TestCase):
+
+    def setUp(self):
+        bpy.ops.wm.read_factory_settings(use_empty=True)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.plane = add_cube("Plane")
+        self.obj = add_cube("Object")
+        self.written_obj = os.path.join(self.tmp_dir, "written.obj")
+        self.config = dict(
+            renderer_soft.DEFAULT_CONFIG,
+            cloth_backend='external',
+            external_cloth_command=[sys.executable, "-c", IDENTITY_SOLVER, "{input}", "{output}", self.written_obj],
+            save_parameters=False
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_writes_the_transform_set_before_the_simulation(self):
+        # Set the same way main does, without evaluating the depsgraph
+        rotation = (0.3, 1.1, -0.7)
+        self.obj.rotation_euler = rotation
+        self.obj.location.z = 0.2
+        expected = np.array([
+            (Matrix.Translation((0, 0, 0.2)) @ Euler(rotation).to_matrix().to_4x4() @ Vector(co))[:]
+            for co in renderer_soft.get_vertex_coords(self.obj)
+        ])
+
+        renderer_soft.simulate_external(self.plane, self.obj, self.tmp_dir, self.config)
+
+        np.testing.assert_allclose(renderer_soft.read_obj_vertices(self.written_obj), expected, atol=1e-5)
+        # A solver that returns the mesh unchanged leaves the object where it was
+        np.testing.assert_allclose(world_coords(self.obj), expected, atol=1e-5)
+
+if __name__ == "__main__":
+    result = unittest.main(argv=[__file__], exit=False).result
+    if not result.wasSuccessful():
+        sys.exit(1)
@@ -1,6 +1,12 @@
 import os
-from PIL import Image
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial, lru_cache
+import numpy as np
 import math
+import re
+
+# Render files are named render_<angle>.<ext>, the angle is used to sort them
+_RENDER_FILE_RE = re.compile(r'^render_(\d+)\.(?i:png|jpe?g|bmp)$')
 
 def is_valid_image_dir(dir_path):
     """
@@ -8,11 +14,15 @@ def is_valid_image_dir(dir_path):
     """
     if not os.path.isdir(dir_path):
         return False
-        
-    image_files = [f for f in os.listdir(dir_path) 
-                  if f.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp'))
-                  and f.startswith('render_')]
-    return len(image_files) > 0
+    
+    return _has_render_files(dir_path)
+
+def _has_render_files(dir_path):
+    """
+    Check if a directory contains render files, stopping at the first one found
+    """
+    with os.scandir(dir_path) as entries:
+        return any(_RENDER_FILE_RE.match(entry.name) for entry in entries)
 
 def get_render_dirs(input_dir):
     """
@@ -20,22 +30,23 @@ def get_render_dirs(input_dir):
     """
     render_dirs = []
     
-    # Check immediate subdirectories
-    for item in os.listdir(input_dir):
-        item_path = os.path.join(input_dir, item)
-        
-        # Check if it's a directory and contains renders
-        if is_valid_image_dir(item_path):
-            render_dirs.append(item_path)
-            continue
+    # Check immediate subdirectories, scandir entries cache the file type so no extra stat calls are needed
+    with os.scandir(input_dir) as items:
+        for item in items:
+            if not item.is_dir():
+                continue
+            
+            # Check if the directory contains renders
+            if _has_render_files(item.path):
+                render_dirs.append(item.path)
+                continue
             
-        # Check if it's a directory that might contain render subdirectories
-        if os.path.isdir(item_path):
-            # Look for numbered dirs (0,1,2,3) or _run_ dirs
-            for subdir in os.listdir(item_path):
-                subdir_path = os.path.join(item_path, subdir)
-                if (subdir.isdigit() or subdir.startswith('_run_')) and is_valid_image_dir(subdir_path):
-                    render_dirs.append(subdir_path)
+            # Look for numbered dirs (0,1,2,3) or _run_ dirs that contain renders
+            with os.scandir(item.path) as subdirs:
+                for subdir in subdirs:
+                    if ((subdir.name.isdigit() or subdir.name.startswith('_run_'))
+                            and subdir.is_dir() and _has_render_files(subdir.path)):
+                        render_dirs.append(subdir.path)
     
     return render_dirs
 
@@ -59,7 +70,171 @@ def calculate_grid_layout(num_images):
         max_cols = max(top_row, bottom_row)
         return 2, max_cols, [top_row, bottom_row]
 
-def composite_images(input_dir, output_dir, img_width=1920, img_height=1080, allow_overflow=True, bg_color='white'):
+@lru_cache(maxsize=None)
+def _get_cv2():
+    """
+    Import OpenCV on first use, so importing this module and starting the pool workers does not load it.
+    Returns None when it is not installed, the result is cached so the import is only attempted once.
+    """
+    try:
+        import cv2
+    except ImportError:
+        return None
+    return cv2
+
+def resize_tile(img, size):
+    """
+    Resize an RGB or RGBA image to size (width, height) and return it as a NumPy array.
+    Uses OpenCV when available, with Lanczos for enlarging and area averaging for shrinking
+    since the fixed Lanczos kernel of OpenCV aliases when downscaling. Alpha is premultiplied
+    around the resize like PIL does, so transparent pixels do not bleed into the edges.
+    Falls back to PIL's Lanczos resize.
+    """
+    # OpenCV resizes with SIMD kernels and is used for the tiles when it is installed
+    cv2 = _get_cv2()
+    if cv2 is None:
+        from PIL import Image
+        return np.asarray(img.resize(size, Image.Resampling.LANCZOS))
+    
+    interpolation = cv2.INTER_AREA if size[0] < img.width else cv2.INTER_LANCZOS4
+    tile = np.asarray(img)
+    if tile.shape[2] == 3:
+        return cv2.resize(tile, size, interpolation=interpolation)
+    
+    tile = tile.astype(np.float32)
+    tile[..., :3] *= tile[..., 3:4] / 255
+    tile = cv2.resize(tile, size, interpolation=interpolation)
+    
+    alpha = np.clip(tile[..., 3:4], 0, 255)
+    tile[..., :3] = np.divide(tile[..., :3] * 255, alpha, out=np.zeros_like(tile[..., :3]), where=alpha > 0)
+    tile[..., 3:4] = alpha
+    return np.clip(tile + 0.5, 0, 255).astype(np.uint8)
+
+def paste_tile(buffer, tile, x, y):
+    """
+    Paste an RGB or RGBA tile into an RGB buffer at (x, y), clipping it to the buffer bounds.
+    Opaque tiles are copied with a slice assignment, transparent ones are alpha blended over the buffer.
+    """
+    height, width = buffer.shape[:2]
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + tile.shape[1], width), min(y + tile.shape[0], height)
+    if x0 >= x1 or y0 >= y1:
+        return
+    
+    tile = tile[y0 - y:y1 - y, x0 - x:x1 - x]
+    target = buffer[y0:y1, x0:x1]
+    
+    if tile.shape[2] == 3 or tile[..., 3].min() == 255:
+        target[...] = tile[..., :3]
+        return
+    
+    # Integer blend with rounding, 255 * 255 + 127 still fits in uint16
+    alpha = tile[..., 3:4].astype(np.uint16)
+    blended = tile[..., :3] * alpha + target * (255 - alpha) + 127
+    target[...] = (blended // 255).astype(np.uint8)
+
+def _composite_one(render_dir, output_dir, img_width, img_height, allow_overflow, bg_color, output_format):
+    """
+    Creates the composite image of a single render directory
+    Returns the name of the written composite, or None if the directory has no renders
+    """
+    # PIL is imported on first use, so importing this module for its helpers does not load it
+    from PIL import Image, ImageColor
+    
+    # Get all render images sorted by angle, the match gives both the filter and the angle
+    angle_files = []
+    for f in os.listdir(render_dir):
+        match = _RENDER_FILE_RE.match(f)
+        if match:
+            angle_files.append((int(match.group(1)), f))
+    angle_files.sort()
+    image_files = [f for _, f in angle_files]
+    
+    num_images = len(image_files)
+    if num_images == 0:
+        return None
+        
+    # Calculate balanced grid layout
+    grid_rows, grid_cols, images_per_row = calculate_grid_layout(num_images)
+    
+    composite_width = img_width * grid_cols
+    composite_height = img_height * grid_rows
+    
+    # The background is opaque, so the tiles are blended straight into an RGB buffer
+    composite = np.empty((composite_height, composite_width, 3), dtype=np.uint8)
+    # Colors can be given by name like PIL accepts them, or as RGB tuples
+    if isinstance(bg_color, str):
+        bg_color = ImageColor.getrgb(bg_color)
+    composite[...] = bg_color[:3]
+    
+    image_index = 0
+    for row in range(grid_rows):
+        # Calculate centering offset for this row
+        row_images = images_per_row[row]
+        row_offset = (grid_cols - row_images) * img_width // 2
+        
+        for col in range(row_images):
+            if image_index >= num_images:
+                break
+                
+            img_file = image_files[image_index]
+            img_path = os.path.join(render_dir, img_file)
+            img = Image.open(img_path)
+            if img.mode not in ('RGB', 'RGBA'):
+                img = img.convert('RGBA')
+            
+            # Calculate centered position for this image
+            cell_x = col * img_width + row_offset + (img_width // 2)
+            cell_y = row * img_height + (img_height // 2)
+            
+            if allow_overflow:
+                aspect = img.width / img.height
+                if aspect > 1:
+                    new_width = img_width
+                    new_height = int(img_width / aspect)
+                else:
+                    new_height = img_height
+                    new_width = int(img_height * aspect)
+            else:
+                img_aspect = img.width / img.height
+                cell_aspect = img_width / img_height
+                
+                if img_aspect > cell_aspect:
+                    new_width = img_width
+                    new_height = int(img_width / img_aspect)
+                else:
+                    new_height = img_height
+                    new_width = int(img_height * img_aspect)
+            
+            tile = resize_tile(img, (new_width, new_height))
+            
+            paste_x = cell_x - (new_width // 2)
+            paste_y = cell_y - (new_height // 2)
+            
+            paste_tile(composite, tile, paste_x, paste_y)
+            image_index += 1
+    
+    # Generate output filename based on directory structure
+    dir_name = os.path.basename(render_dir)
+    parent_dir = os.path.basename(os.path.dirname(render_dir))
+    
+    extension = 'jpg' if output_format == 'jpeg' else 'png'
+    if dir_name.isdigit():  # For renderer_hard.py structure
+        output_name = f"{parent_dir}_rotation_{dir_name}_composite.{extension}"
+    elif dir_name.startswith('_run_'):  # For renderer_soft.py structure
+        output_name = f"{parent_dir}_{dir_name}_composite.{extension}"
+    else:
+        output_name = f"{dir_name}_composite.{extension}"
+        
+    output_path = os.path.join(output_dir, output_name)
+    if output_format == 'jpeg':
+        # The composite is opaque, so JPEG loses nothing but compression artifacts and encodes much faster
+        Image.fromarray(composite, 'RGB').save(output_path, format='JPEG', quality=92)
+    else:
+        Image.fromarray(composite, 'RGB').save(output_path)
+    return output_name
+
+def composite_images(input_dir, output_dir, img_width=1920, img_height=1080, allow_overflow=True, bg_color='white', max_workers=None, output_format='png'):
     """
     Creates composite images from folders containing rendered images arranged in a grid
     
@@ -69,99 +244,40 @@ def composite_images(input_dir, output_dir, img_width=1920, img_height=1080, all
         img_width (int): Width of each individual image in the grid
         img_height (int): Height of each individual image in the grid
         allow_overflow (bool): If True, images can overflow their grid cell
-        bg_color (str): Background color for the composite image (default: 'white')
+        bg_color (str or tuple): Background color for the composite image, a color name or an RGB tuple (default: 'white')
+        max_workers (int): Number of worker processes, defaults to the number of CPUs
+        output_format (str): 'png' or 'jpeg', JPEG encodes several times faster (default: 'png')
     """
+    if output_format not in ('png', 'jpeg'):
+        raise ValueError(f"Unsupported output format: {output_format}")
+    
     os.makedirs(output_dir, exist_ok=True)
     
     render_dirs = get_render_dirs(input_dir)
     
-    for render_dir in render_dirs:
-        # Get all render images sorted by angle
-        image_files = [f for f in os.listdir(render_dir) 
-                      if f.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp'))
-                      and f.startswith('render_')]
-        image_files.sort(key=lambda x: int(x.split('_')[1].split('.')[0]))  # Sort by angle number
-        
-        num_images = len(image_files)
-        if num_images == 0:
-            continue
-            
-        # Calculate balanced grid layout
-        grid_rows, grid_cols, images_per_row = calculate_grid_layout(num_images)
-        
-        composite_width = img_width * grid_cols
-        composite_height = img_height * grid_rows
-        
-        composite = Image.new('RGBA', (composite_width, composite_height), bg_color)
-        
-        image_index = 0
-        for row in range(grid_rows):
-            # Calculate centering offset for this row
-            row_images = images_per_row[row]
-            row_offset = (grid_cols - row_images) * img_width // 2
-            
-            for col in range(row_images):
-                if image_index >= num_images:
-                    break
-                    
-                img_file = image_files[image_index]
-                img_path = os.path.join(render_dir, img_file)
-                img = Image.open(img_path).convert('RGBA')
-                
-                # Calculate centered position for this image
-                cell_x = col * img_width + row_offset + (img_width // 2)
-                cell_y = row * img_height + (img_height // 2)
-                
-                if allow_overflow:
-                    aspect = img.width / img.height
-                    if aspect > 1:
-                        new_width = img_width
-                        new_height = int(img_width / aspect)
-                    else:
-                        new_height = img_height
-                        new_width = int(img_height * aspect)
-                else:
-                    img_aspect = img.width / img.height
-                    cell_aspect = img_width / img_height
-                    
-                    if img_aspect > cell_aspect:
-                        new_width = img_width
-                        new_height = int(img_width / img_aspect)
-                    else:
-                        new_height = img_height
-                        new_width = int(img_height * img_aspect)
-                
-                img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                
-                paste_x = cell_x - (img.width // 2)
-                paste_y = cell_y - (img.height // 2)
-                
-                composite.paste(img, (paste_x, paste_y), img)
-                image_index += 1
-        
-        # Generate output filename based on directory structure
-        dir_name = os.path.basename(render_dir)
-        parent_dir = os.path.basename(os.path.dirname(render_dir))
-        
-        if dir_name.isdigit():  # For renderer_hard.py structure
-            output_name = f"{parent_dir}_rotation_{dir_name}_composite.png"
-        elif dir_name.startswith('_run_'):  # For renderer_soft.py structure
-            output_name = f"{parent_dir}_{dir_name}_composite.png"
-        else:
-            output_name = f"{dir_name}_composite.png"
-            
-        output_path = os.path.join(output_dir, output_name)
-        composite = composite.convert('RGB')
-        composite.save(output_path)
-        print(f"Created composite for {output_name}")
+    # Every directory is composited independently, so they are spread over worker processes
+    composite_one = partial(
+        _composite_one,
+        output_dir=output_dir,
+        img_width=img_width,
+        img_height=img_height,
+        allow_overflow=allow_overflow,
+        bg_color=bg_color,
+        output_format=output_format
+    )
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for output_name in executor.map(composite_one, render_dirs):
+            if output_name is not None:
+                print(f"Created composite for {output_name}")
 
-def process_all_folders(base_path, output_dir=None, bg_color='white'):
+def process_all_folders(base_path, output_dir=None, bg_color='white', output_format='png'):
     """
     Processes all folders in base_path, creating composites for each
     Args:
         base_path: Root directory containing folders to process
         output_dir: Optional custom output directory, if None uses base_path/composites
         bg_color: Background color for the composite images (default: 'white')
+        output_format: 'png' or 'jpeg' (default: 'png')
     """
     if output_dir is None:
         output_dir = os.path.join(base_path, "composites")
@@ -175,7 +291,8 @@ def process_all_folders(base_path, output_dir=None, bg_color='white'):
             output_dir=output_dir,
             img_width=1920,
             img_height=1080,
-            bg_color=bg_color
+            bg_color=bg_color,
+            output_format=output_format
         )
         print(f"Completed composites in {output_dir}")
     except Exception as e:
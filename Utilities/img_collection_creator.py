@@ -1,8 +1,57 @@
 import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 
-def collect_images(input_path, output_path):
+def _clear_destination(src_path, dst_path):
+    """
+    Removes an existing destination so it can be written again. Returns False if the destination is
+    the source itself, e.g. for images collected in place, which is left alone.
+    """
+    if not os.path.lexists(dst_path):
+        return True
+    if os.path.realpath(src_path) == os.path.realpath(dst_path):
+        return False
+    # The destination may be a hard link from an earlier linked collection, writing through it would truncate the source
+    os.remove(dst_path)
+    return True
+
+def _fast_copy(src_path, dst_path):
+    """
+    Copies a file with its metadata like shutil.copy2. On Linux the data is copied inside the
+    kernel with os.copy_file_range, which can also use reflinks on filesystems that support them.
+    """
+    if not _clear_destination(src_path, dst_path):
+        return
+    if hasattr(os, 'copy_file_range'):
+        try:
+            with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+                remaining = os.fstat(src.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+                    if copied == 0:
+                        raise OSError("copy_file_range stopped before the end of the file")
+                    remaining -= copied
+        except OSError:
+            # Not supported between these filesystems, copy through user space instead
+            shutil.copyfile(src_path, dst_path)
+    else:
+        shutil.copyfile(src_path, dst_path)
+    shutil.copystat(src_path, dst_path)
+
+def _link_or_copy(src_path, dst_path):
+    """
+    Hard links the file when source and destination are on the same filesystem, copies it otherwise
+    """
+    # Removing and linking is not atomic, collect_images only calls this once per destination
+    if not _clear_destination(src_path, dst_path):
+        return
+    try:
+        os.link(src_path, dst_path)
+    except OSError:
+        _fast_copy(src_path, dst_path)
+
+def collect_images(input_path, output_path, max_workers=None, link=False):
     """
     Collects all images from nested folders and copies them to a single output folder,
     prefixing filenames with parent folder names.
@@ -10,26 +59,32 @@ def collect_images(input_path, output_path):
     Args:
         input_path (str): Root directory containing folders with images
         output_path (str): Output directory where all images will be copied
+        max_workers (int): Number of copy threads, copying is I/O bound so this may exceed the CPU count
+        link (bool): Hard link the images instead of copying them where possible. No data is copied, but the
+            collected files share their contents with the originals, so editing one in place changes both
     """
     
     os.makedirs(output_path, exist_ok=True)
     
-    all_image_files = []
+    # Different folders can map to the same name (a/b_c.png and a_b/c.png), copying both at once would
+    # interleave their writes, so like the sequential copy the image walked last wins
+    dst_to_src = {}
     for root, dirs, files in os.walk(input_path):
         image_files = [f for f in files if f.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp'))]
         if image_files:
+            # The prefix is the same for every image of the directory
             rel_path = os.path.relpath(root, input_path)
-            path_parts = rel_path.split(os.sep)
-            all_image_files.extend([(root, img_file, path_parts) for img_file in image_files])
+            prefix = '_'.join(part for part in rel_path.split(os.sep) if part != '.')
+            name_prefix = os.path.join(output_path, f"{prefix}_" if prefix else "")
+            for img_file in image_files:
+                dst_to_src[name_prefix + img_file] = os.path.join(root, img_file)
+    dst_paths = list(dst_to_src)
+    src_paths = [dst_to_src[dst_path] for dst_path in dst_paths]
     
-    for root, img_file, path_parts in tqdm(all_image_files, desc="Copying images"):
-        prefix = '_'.join(part for part in path_parts if part != '.')
-        new_filename = f"{prefix}_{img_file}" if prefix else img_file
-            
-        src_path = os.path.join(root, img_file)
-        dst_path = os.path.join(output_path, new_filename)
-        
-        shutil.copy2(src_path, dst_path)
+    # The copies only wait on the disk, so they run in a thread pool
+    copy = _link_or_copy if link else _fast_copy
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(tqdm(executor.map(copy, src_paths, dst_paths), total=len(src_paths), desc="Copying images"))
 
 if __name__ == "__main__":
     input_path = "path/to/your/input/folder"